@@ -9,4 +9,8 @@ class BaseEmbedder(ABC):
     @abstractmethod
     def embed_query(self, text: str) -> list[float]:
         """Return embedding for a single query."""
-        pass
\ No newline at end of file
+        pass
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Return embeddings for several queries, one per text."""
+        return [self.embed_query(t) for t in texts]
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from .base_embedder import BaseEmbedder
+
+class CachedEmbedder(BaseEmbedder):
+    """Persistent embedding cache keyed by (model, sha256 of the text).
+
+    Wraps any BaseEmbedder; only texts missing from the cache are sent to
+    the wrapped embedder. Vectors are stored as float32 blobs and the least
+    recently used entries are evicted once max_entries is exceeded.
+    """
+
+    def __init__(
+            self,
+            embedder: BaseEmbedder,
+            path: str = "./db/embedding_cache.sqlite3",
+            max_entries: int = 200_000,
+            cache_queries: bool = True,
+    ):
+        self.embedder = embedder
+        self.model_name = getattr(embedder, "model_name", type(embedder).__name__)
+        self.max_entries = max_entries
+        self.cache_queries = cache_queries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                   model TEXT NOT NULL,
+                   text_hash TEXT NOT NULL,
+                   vector BLOB NOT NULL,
+                   last_used REAL NOT NULL,
+                   PRIMARY KEY (model, text_hash)
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT text_hash, vector FROM embeddings "
+                f"WHERE model = ? AND text_hash IN ({placeholders})",
+                [model, *batch],
+            )
+            for text_hash, blob in rows:
+                vector = array("f")
+                vector.frombytes(blob)
+                found[text_hash] = vector.tolist()
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                [(now, model, h) for h in found],
+            )
+        return found
+
+    def _store(self, model: str, items: dict[str, list[float]]):
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            [
+                (model, h, array("f", vector).tobytes(), now)
+                for h, vector in items.items()
+            ],
+        )
+        self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN ("
+                "SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (overflow,),
+            )
+
+    def _count(self, hashes: list[str], texts: list[str], cached: dict) -> dict[str, str]:
+        # Called under self._lock; embeds each missing text once, even if it
+        # repeats in the batch
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h in cached:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.setdefault(h, text)
+        return missing
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [self._hash(t) for t in texts]
+
+        with self._lock:
+            cached = self._lookup(self.model_name, list(set(hashes)))
+            self._conn.commit()
+            missing = self._count(hashes, texts, cached)
+
+        if missing:
+            vectors = self.embedder.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._store(self.model_name, fresh)
+                self._conn.commit()
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        if not self.cache_queries:
+            return self.embedder.embed_queries(texts)
+
+        # Some models embed queries differently from documents
+        model = f"{self.model_name}:query"
+        hashes = [self._hash(t) for t in texts]
+        with self._lock:
+            cached = self._lookup(model, list(set(hashes)))
+            self._conn.commit()
+            missing = self._count(hashes, texts, cached)
+
+        if missing:
+            vectors = self.embedder.embed_queries(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            with self._lock:
+                self._store(model, fresh)
+                self._conn.commit()
+            cached.update(fresh)
+
+        return [cached[h] for h in hashes]
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": size,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
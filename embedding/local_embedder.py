@@ -1,12 +1,128 @@
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
+import numpy as np
 from .base_embedder import BaseEmbedder
 
 class LocalEmbedder(BaseEmbedder):
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+            self,
+            model_name: str = "all-MiniLM-L6-v2",
+            batch_size: int = 64,
+            num_workers: int = 1,
+            show_progress_bar: bool = True,
+            query_cache_size: int = 1024,
+    ):
+        self.model_name = model_name
+        self._model = None
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.show_progress_bar = show_progress_bar
+        self._pool = None
+        self.query_cache_size = query_cache_size
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
+
+    @property
+    def model(self):
+        # Loading the transformer takes seconds, so defer it to the first encode
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+            self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        """Encode texts into a contiguous float32 array, one row per text.
+
+        Texts are sorted by length so every batch holds similarly sized
+        inputs and pads less; rows are put back in input order afterwards.
+        With num_workers > 1 the batches are spread over a process pool.
+        """
+        if not texts:
+            dim = self.model.get_sentence_embedding_dimension()
+            return np.empty((0, dim), dtype=np.float32)
+
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        ordered = [texts[i] for i in order]
+
+        if self.num_workers > 1:
+            embeddings = self.model.encode_multi_process(
+                ordered,
+                self._get_pool(),
+                batch_size=self.batch_size,
+            )
+        else:
+            embeddings = self.model.encode(
+                ordered,
+                batch_size=self.batch_size,
+                show_progress_bar=self.show_progress_bar,
+                convert_to_numpy=True,
+            )
+
+        result = np.empty_like(embeddings, dtype=np.float32)
+        result[order] = embeddings
+        return result
+
+    def _get_pool(self):
+        if self._pool is None:
+            devices = ["cpu"] * self.num_workers
+            self._pool = self.model.start_multi_process_pool(target_devices=devices)
+        return self._pool
+
+    def close(self):
+        """Stop the worker pool if one was started"""
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        return self.model.encode(texts, show_progress_bar=True).tolist()
+        return self.encode(texts).tolist()
 
     def embed_query(self, text: str) -> list[float]:
-        return self.model.encode([text])[0].tolist()
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed queries through an LRU cache, encoding all misses in one call"""
+        results = {}
+        # Insertion-ordered set; each unique text counts as one hit or miss
+        missing = {}
+        with self._query_lock:
+            for text in texts:
+                if text in results or text in missing:
+                    continue
+                vector = self._query_cache.get(text)
+                if vector is None:
+                    self.query_misses += 1
+                    missing[text] = None
+                else:
+                    self.query_hits += 1
+                    self._query_cache.move_to_end(text)
+                    results[text] = vector
+
+        if missing:
+            vectors = self.model.encode(list(missing), batch_size=self.batch_size).tolist()
+            with self._query_lock:
+                for text, vector in zip(missing, vectors):
+                    results[text] = vector
+                    if self.query_cache_size > 0:
+                        self._query_cache[text] = vector
+                        self._query_cache.move_to_end(text)
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+
+        return [results[text] for text in texts]
+
+    def query_cache_stats(self) -> dict:
+        total = self.query_hits + self.query_misses
+        return {
+            "hits": self.query_hits,
+            "misses": self.query_misses,
+            "hit_rate": self.query_hits / total if total else 0.0,
+            "size": len(self._query_cache),
+            "capacity": self.query_cache_size,
+        }
+
+    def clear_query_cache(self):
+        with self._query_lock:
+            self._query_cache.clear()
@@ -1,5 +1,3 @@
-from langchain_openai import OpenAIEmbeddings
-
 from .base_embedder import BaseEmbedder
 
 class OpenAIEmbedder(BaseEmbedder):
@@ -7,7 +5,15 @@ class OpenAIEmbedder(BaseEmbedder):
 
     def __init__(self, model_name: str = "text-embedding-3-small"):
        
-        self.embedder = OpenAIEmbeddings(model=model_name)
+        self.model_name = model_name
+        self._embedder = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            from langchain_openai import OpenAIEmbeddings
+            self._embedder = OpenAIEmbeddings(model=self.model_name)
+        return self._embedder
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings for multiple text chunks."""
@@ -16,3 +22,7 @@ class OpenAIEmbedder(BaseEmbedder):
     def embed_query(self, text: str) -> list[float]:
         """Generate embedding for a single query string."""
         return self.embedder.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for several queries in one request."""
+        return self.embedder.embed_documents(texts)
@@ -1,7 +1,12 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
 
 class BaseParser(ABC):
     @abstractmethod
     def parse(self, file_path: str) -> str:
         """Return the text content of the file"""
         pass
+
+    def iter_pages(self, file_path: str) -> Iterator[tuple[int, str]]:
+        """Yield (page_number, text) pairs; parsers without pages yield one"""
+        yield 1, self.parse(file_path)
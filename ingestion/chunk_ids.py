@@ -0,0 +1,27 @@
+import re
+
+# Ingest names every chunk "<file>_<page>_<index>": ids are reused page by
+# page on re-ingest, and packing and hybrid retrieval read them back to
+# find a chunk's file, page and neighbours
+_CHUNK_ID_RE = re.compile(r"^(?P<source>.+)_(?P<page>\d+)_(?P<index>\d+)$")
+
+
+def make_chunk_id(file_name: str, page: int, index: int) -> str:
+    return f"{file_name}_{page}_{index}"
+
+
+def parse_chunk_id(chunk_id: str) -> tuple[str, int, int] | None:
+    """(file_name, page, index) of a chunk id, or None for ids of another scheme"""
+    match = _CHUNK_ID_RE.match(chunk_id or "")
+    if not match:
+        return None
+    return match["source"], int(match["page"]), int(match["index"])
+
+
+def chunk_metadata(chunk_id: str) -> dict:
+    """The metadata ingest stores with a chunk, rebuilt from its id"""
+    parsed = parse_chunk_id(chunk_id)
+    if parsed is None:
+        return {"chunk_id": chunk_id}
+    file_name, page, _ = parsed
+    return {"source": file_name, "chunk_id": chunk_id, "document": file_name, "page": page}
@@ -1,10 +1,79 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator
 from PyPDF2 import PdfReader
 from .base_parser import BaseParser
 
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> list[tuple[int, str]]:
+    # Runs in a worker process, so it opens its own reader
+    reader = PdfReader(file_path)
+    return [
+        (i + 1, reader.pages[i].extract_text() or "")
+        for i in range(start, stop)
+    ]
+
+
 class PDFParser(BaseParser):
+    def __init__(self, max_workers: int | None = None, prefetch_files: int = 2):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Files extracted ahead of the consumer; bounds memory on big batches
+        self.prefetch_files = max(1, prefetch_files)
+
     def parse(self, file_path: str) -> str:
+        return "".join(text for _, text in self.iter_pages(file_path))
+
+    def iter_pages(self, file_path: str) -> Iterator[tuple[int, str]]:
+        """Yield (page_number, text) one page at a time, page numbers start at 1"""
         reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        return text
+        for i, page in enumerate(reader.pages, 1):
+            yield i, page.extract_text() or ""
+
+    def parse_many(self, file_paths: list[str]) -> Iterator[tuple[str, list[tuple[int, str]]]]:
+        """Extract pages of one or many PDFs across a process pool.
+
+        Pages are split into contiguous ranges so each worker opens a file
+        once. Yields (file_path, pages) once per range, in input and page
+        order, as soon as that range is extracted, so callers can start
+        chunking before a file is complete; group consecutive results by
+        file_path to rebuild whole files. A file without pages yields one
+        empty range. At most prefetch_files files are in flight at a time.
+        """
+        if self.max_workers == 1:
+            for file_path in file_paths:
+                empty = True
+                for page in self.iter_pages(file_path):
+                    empty = False
+                    yield file_path, [page]
+                if empty:
+                    yield file_path, []
+            return
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            def submit(file_path):
+                num_pages = len(PdfReader(file_path).pages)
+                step = max(1, -(-num_pages // self.max_workers))
+                futures = [
+                    pool.submit(_extract_page_range, file_path, start, min(start + step, num_pages))
+                    for start in range(0, num_pages, step)
+                ]
+                return file_path, futures
+
+            remaining = iter(file_paths)
+            pending = deque()
+            for file_path in remaining:
+                pending.append(submit(file_path))
+                if len(pending) >= self.prefetch_files:
+                    break
+
+            while pending:
+                file_path, futures = pending.popleft()
+                next_path = next(remaining, None)
+                if next_path is not None:
+                    pending.append(submit(next_path))
+
+                if not futures:
+                    yield file_path, []
+                for future in futures:
+                    yield file_path, future.result()
@@ -1,6 +1,189 @@
+import asyncio
+import functools
+import threading
+import time
 from abc import ABC, abstractmethod
+from typing import AsyncIterator, Callable, Iterator
+from .context_packer import CONTEXT_BUDGETS, DEFAULT_CONTEXT_BUDGET, pack_context
+
+DEFAULT_CONCURRENCY = 4
+
+
+class StreamTimings:
+    """Timings of one streamed response, in seconds"""
+
+    def __init__(self):
+        self._start = time.perf_counter()
+        self.time_to_first_token: float | None = None
+        self.duration: float | None = None
+
+    def token(self):
+        if self.time_to_first_token is None:
+            self.time_to_first_token = time.perf_counter() - self._start
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._start
+
 
 class BaseChain(ABC):
+    _llm = None
+
+    # Optional ResponseCache shared by chains; None disables caching
+    response_cache = None
+    # Optional SemanticCache for near-duplicate topics of one subject
+    semantic_cache = None
+
+    # Token budget for retrieved context; None uses the per-model default
+    context_budget: int | None = None
+
+    # In-flight LLM requests allowed per model backend, shared by all chains
+    _concurrency_limits: dict[str, int] = {}
+    _semaphores: dict[tuple[int, str], asyncio.Semaphore] = {}
+    _semaphores_lock = threading.Lock()
+
     @abstractmethod
     def run(self, query: str) -> str:
         pass
+
+    async def arun(self, *args, **kwargs):
+        """Async counterpart of run; chains override this with native async calls"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.run, *args, **kwargs))
+
+    def _budget(self) -> int:
+        """Token budget for context text sent to this chain's model"""
+        if self.context_budget is not None:
+            return self.context_budget
+        return CONTEXT_BUDGETS.get(getattr(self, "model", None), DEFAULT_CONTEXT_BUDGET)
+
+    def _pack(self, context_chunks: list[str], metadatas: list[dict] | None = None) -> str:
+        """Join retrieved chunks without overlaps, within the model's context budget"""
+        return pack_context(context_chunks, max_tokens=self._budget(), metadatas=metadatas)
+
+    def _cache_get(self, prompt: str, use_cache: bool = True) -> str | None:
+        if not use_cache or self.response_cache is None:
+            return None
+        return self.response_cache.get(self.model, self.temperature, prompt)
+
+    def _cache_put(self, prompt: str, response: str, use_cache: bool = True):
+        if use_cache and self.response_cache is not None:
+            self.response_cache.put(self.model, self.temperature, prompt, response)
+
+    def _semantic_get(self, namespace: str, topic: str, use_cache: bool = True) -> str | None:
+        if not use_cache or self.semantic_cache is None:
+            return None
+        return self.semantic_cache.get(f"{namespace}:{self.model}", topic)
+
+    def _semantic_put(self, namespace: str, topic: str, response: str, use_cache: bool = True):
+        if use_cache and self.semantic_cache is not None:
+            self.semantic_cache.put(f"{namespace}:{self.model}", topic, response)
+
+    async def _asemantic_get(self, namespace: str, topic: str, use_cache: bool = True) -> str | None:
+        # The semantic cache embeds the topic, so keep it off the loop too
+        if not use_cache or self.semantic_cache is None:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._semantic_get, namespace, topic, use_cache)
+        )
+
+    async def _asemantic_put(self, namespace: str, topic: str, response: str, use_cache: bool = True):
+        if use_cache and self.semantic_cache is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, functools.partial(self._semantic_put, namespace, topic, response, use_cache)
+            )
+
+    @abstractmethod
+    def _make_llm(self):
+        """Build the chat model; called once, on first use of self.llm"""
+        pass
+
+    @property
+    def llm(self):
+        # langchain and the model client are only imported when a chain
+        # actually talks to the model, which keeps startup fast
+        if self._llm is None:
+            self._llm = self._make_llm()
+        return self._llm
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+
+    @classmethod
+    def set_concurrency_limit(cls, model: str, limit: int):
+        """Set how many requests may be in flight at once for one model"""
+        with cls._semaphores_lock:
+            BaseChain._concurrency_limits[model] = limit
+            for key in [k for k in BaseChain._semaphores if k[1] == model]:
+                del BaseChain._semaphores[key]
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        model = getattr(self, "model", type(self).__name__)
+        # Semaphores belong to one event loop
+        key = (id(asyncio.get_running_loop()), model)
+        with self._semaphores_lock:
+            semaphore = BaseChain._semaphores.get(key)
+            if semaphore is None:
+                limit = BaseChain._concurrency_limits.get(model, DEFAULT_CONCURRENCY)
+                semaphore = asyncio.Semaphore(limit)
+                BaseChain._semaphores[key] = semaphore
+            return semaphore
+
+    async def _ainvoke(self, prompt: str) -> str:
+        async with self._semaphore():
+            response = await self.llm.ainvoke(prompt)
+        return response.content
+
+    def _retrieve_documents(self, query: str, top_k: int = 2) -> tuple[list[str], list[dict]]:
+        """Retrieved texts and their metadata (empty dicts if the retriever has none)"""
+        if hasattr(self.retriever, "retrieve_documents"):
+            documents = self.retriever.retrieve_documents(query, top_k=top_k)
+        else:
+            documents = [(text, {}) for text in self.retriever.retrieve(query, top_k=top_k)]
+        return [text for text, _ in documents], [meta for _, meta in documents]
+
+    async def _aretrieve_documents(self, query: str, top_k: int = 2) -> tuple[list[str], list[dict]]:
+        # Retrieval and query embedding are blocking, so keep them off the loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._retrieve_documents, query, top_k)
+        )
+
+    def _stream(
+            self,
+            prompt: str,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> Iterator[str]:
+        """Yield response tokens as the model produces them.
+
+        on_timings receives this stream's StreamTimings once it ends.
+        """
+        timings = StreamTimings()
+        try:
+            for chunk in self.llm.stream(prompt):
+                if chunk.content:
+                    timings.token()
+                    yield chunk.content
+        finally:
+            timings.finish()
+            if on_timings is not None:
+                on_timings(timings)
+
+    async def _astream(
+            self,
+            prompt: str,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> AsyncIterator[str]:
+        async with self._semaphore():
+            timings = StreamTimings()
+            try:
+                async for chunk in self.llm.astream(prompt):
+                    if chunk.content:
+                        timings.token()
+                        yield chunk.content
+            finally:
+                timings.finish()
+                if on_timings is not None:
+                    on_timings(timings)
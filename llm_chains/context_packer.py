@@ -0,0 +1,150 @@
+from ingestion.chunk_ids import parse_chunk_id
+
+# Rough context budgets in tokens for retrieved text, leaving room in the
+# model window for the instructions and the answer. Ollama serves models
+# with a small default num_ctx, so local models get tight budgets.
+CONTEXT_BUDGETS = {
+    "llama3.2:3b": 1200,
+    "mistral": 1200,
+    "gpt-3.5-turbo": 8000,
+}
+DEFAULT_CONTEXT_BUDGET = 1200
+
+# The ingest splitter overlaps neighbouring chunks by up to 50 characters
+MIN_OVERLAP = 20
+MAX_OVERLAP = 80
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (about four characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def split_to_budget(text: str, max_tokens: int) -> list[str]:
+    """Split text on line breaks into pieces of at most max_tokens each"""
+    max_chars = max_tokens * 4
+    pieces = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        # A single overlong line is cut hard
+        while len(line) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chars])
+            line = line[max_chars:]
+        if len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        pieces.append(current)
+    return [p for p in pieces if p.strip()]
+
+
+def _normalise(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right"""
+    for size in range(min(MAX_OVERLAP, len(left), len(right)), MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_by_chunk_id(chunks: list[str], metadatas: list[dict]) -> list[str]:
+    """Join chunks that are consecutive on the same page, keeping relevance order"""
+    keyed = []
+    for rank, (text, meta) in enumerate(zip(chunks, metadatas)):
+        parsed = parse_chunk_id(str((meta or {}).get("chunk_id", "")))
+        if parsed:
+            source, page, index = parsed
+            keyed.append(((source, page), index, rank, text))
+        else:
+            keyed.append(((None, rank), 0, rank, text))
+
+    merged = []  # [first_rank, page_key, last_index, text]
+    for page_key, index, rank, text in sorted(keyed, key=lambda k: (str(k[0]), k[1])):
+        last = merged[-1] if merged else None
+        if last and page_key[0] is not None and last[1] == page_key and last[2] + 1 == index:
+            size = _overlap(last[3], text)
+            last[3] = last[3] + text[size:] if size else last[3] + " " + text
+            last[0] = min(last[0], rank)
+            last[2] = index
+        else:
+            merged.append([rank, page_key, index, text])
+    return [text for _, _, _, text in sorted(merged, key=lambda m: m[0])]
+
+
+def _merge_by_overlap(chunks: list[str]) -> list[str]:
+    """Join chunks whose edges overlap the way neighbouring splitter chunks do"""
+    # A merged chunk keeps the rank of its most relevant part
+    merged = [[rank, text] for rank, text in enumerate(chunks)]
+    changed = True
+    while changed:
+        changed = False
+        for left in merged:
+            for right in merged:
+                if left is right:
+                    continue
+                size = _overlap(left[1], right[1])
+                if size:
+                    left[0] = min(left[0], right[0])
+                    left[1] = left[1] + right[1][size:]
+                    merged.remove(right)
+                    changed = True
+                    break
+            if changed:
+                break
+    return [text for _, text in sorted(merged, key=lambda m: m[0])]
+
+
+def pack_chunks(chunks: list[str], metadatas: list[dict] | None = None) -> list[str]:
+    """Drop duplicate and contained chunks and merge neighbours, most relevant first"""
+    keep = []
+    seen = set()
+    for i, text in enumerate(chunks):
+        key = _normalise(text)
+        if key and key not in seen:
+            seen.add(key)
+            keep.append(i)
+    unique = [chunks[i] for i in keep]
+
+    # Chunk ids name the true neighbours; guessing from overlapping edges is
+    # only for retrievers that return no metadata at all
+    if metadatas is not None and any((meta or {}).get("chunk_id") for meta in metadatas):
+        merged = _merge_by_chunk_id(unique, [metadatas[i] for i in keep])
+    else:
+        merged = _merge_by_overlap(unique)
+
+    # A chunk already contained in a longer one adds nothing
+    normalised = [_normalise(t) for t in merged]
+    return [
+        text for i, text in enumerate(merged)
+        if not any(i != j and normalised[i] in normalised[j] and len(normalised[j]) > len(normalised[i])
+                   for j in range(len(merged)))
+    ]
+
+
+def pack_context(
+        chunks: list[str],
+        max_tokens: int | None = None,
+        metadatas: list[dict] | None = None,
+        separator: str = "\n\n",
+) -> str:
+    """Deduplicate and merge chunks, then keep the most relevant ones within max_tokens"""
+    packed = []
+    used = 0
+    for text in pack_chunks(chunks, metadatas):
+        cost = estimate_tokens(text) + (estimate_tokens(separator) if packed else 0)
+        if max_tokens is not None and used + cost > max_tokens:
+            if not packed:
+                # Even the best chunk is too long; keep as much of it as fits
+                packed.append(text[:max_tokens * 4])
+                used = max_tokens
+            # A shorter, less relevant chunk may still fit
+            continue
+        packed.append(text)
+        used += cost
+    return separator.join(packed)
@@ -1,15 +1,19 @@
-from langchain_community.chat_models import ChatOpenAI
-from .base_chain import BaseChain
+from typing import AsyncIterator, Callable, Iterator
+from .base_chain import BaseChain, StreamTimings
 
 class ExplanationChain(BaseChain):
-    def __init__(self, retriever):
+    def __init__(self, retriever, semantic_cache=None):
         self.retriever = retriever
-        self.llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+        self.semantic_cache = semantic_cache
+        self.model = "gpt-3.5-turbo"
+        self.temperature = 0
 
-    def run(self, query: str) -> str:
-        context_chunks = self.retriever.retrieve(query)
-        context_text = "\n\n".join(context_chunks)
-        prompt = f"""
+    def _make_llm(self):
+        from langchain_community.chat_models import ChatOpenAI
+        return ChatOpenAI(model=self.model, temperature=self.temperature)
+
+    def _build_prompt(self, query: str, context_text: str) -> str:
+        return f"""
         You are a helpful study assistant. Use the following context to answer the question.
         Context:
         {context_text}
@@ -17,5 +21,65 @@ class ExplanationChain(BaseChain):
         Question: {query}
         Answer:
         """
+
+    def run(self, query: str, use_cache: bool = True) -> str:
+        cached = self._semantic_get("explanation", query, use_cache)
+        if cached is not None:
+            return cached
+
+        context_chunks, metadatas = self._retrieve_documents(query)
+        context_text = self._pack(context_chunks, metadatas)
+        prompt = self._build_prompt(query, context_text)
         response = self.llm.call_as_llm(prompt)
+        self._semantic_put("explanation", query, response, use_cache)
+        return response
+
+    async def arun(self, query: str, use_cache: bool = True) -> str:
+        cached = await self._asemantic_get("explanation", query, use_cache)
+        if cached is not None:
+            return cached
+
+        context_chunks, metadatas = await self._aretrieve_documents(query)
+        context_text = self._pack(context_chunks, metadatas)
+        response = await self._ainvoke(self._build_prompt(query, context_text))
+        await self._asemantic_put("explanation", query, response, use_cache)
         return response
+
+    def stream(
+            self,
+            query: str,
+            use_cache: bool = True,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> Iterator[str]:
+        """Yield the answer token by token"""
+        cached = self._semantic_get("explanation", query, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        context_chunks, metadatas = self._retrieve_documents(query)
+        context_text = self._pack(context_chunks, metadatas)
+        tokens = []
+        for token in self._stream(self._build_prompt(query, context_text), on_timings):
+            tokens.append(token)
+            yield token
+        self._semantic_put("explanation", query, "".join(tokens), use_cache)
+
+    async def astream(
+            self,
+            query: str,
+            use_cache: bool = True,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> AsyncIterator[str]:
+        cached = await self._asemantic_get("explanation", query, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        context_chunks, metadatas = await self._aretrieve_documents(query)
+        context_text = self._pack(context_chunks, metadatas)
+        tokens = []
+        async for token in self._astream(self._build_prompt(query, context_text), on_timings):
+            tokens.append(token)
+            yield token
+        await self._asemantic_put("explanation", query, "".join(tokens), use_cache)
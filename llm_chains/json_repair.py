@@ -0,0 +1,160 @@
+import json
+import re
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _strip_wrapping(text: str) -> str:
+    """Drop markdown fences and anything before the first brace"""
+    text = re.sub(r"^```(?:json)?\s*\n", "", text.strip(), flags=re.MULTILINE)
+    text = re.sub(r"\n```\s*$", "", text, flags=re.MULTILINE)
+    first_brace = text.find("{")
+    return text[first_brace:] if first_brace > 0 else text
+
+
+def _normalise_quotes(text: str) -> str:
+    """Turn single-quoted strings into JSON strings and Python literals into JSON ones"""
+    text = text.replace("“", '"').replace("”", '"')
+    out = []
+    i = 0
+    in_double = False
+    prev = ""  # last structural character seen outside strings
+    while i < len(text):
+        ch = text[i]
+        if in_double:
+            out.append(ch)
+            if ch == "\\" and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 1
+            elif ch == '"':
+                in_double = False
+            i += 1
+            continue
+
+        if ch == '"':
+            in_double = True
+            out.append(ch)
+        elif ch == "'" and prev in "{[,:":
+            # A single-quoted string in a position where a JSON value or key starts
+            j = i + 1
+            chars = []
+            while j < len(text):
+                if text[j] == "\\" and j + 1 < len(text):
+                    # \' is not a valid JSON escape
+                    chars.append("'" if text[j + 1] == "'" else text[j:j + 2])
+                    j += 2
+                    continue
+                if text[j] == "'" and (j + 1 == len(text) or re.match(r"\s*[:,}\]]", text[j + 1:])):
+                    break
+                chars.append('\\"' if text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(chars) + '"')
+            i = j
+        else:
+            for literal, replacement in (("True", "true"), ("False", "false"), ("None", "null")):
+                if text.startswith(literal, i) and prev in ":[,":
+                    out.append(replacement)
+                    i += len(literal) - 1
+                    break
+            else:
+                out.append(ch)
+        if not ch.isspace():
+            prev = ch
+        i += 1
+    return "".join(out)
+
+
+def _mask_strings(text: str) -> str:
+    """Same-length copy of text with string contents blanked, quotes kept"""
+    out = list(text)
+    in_string = False
+    escape = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                continue
+            out[i] = "_"
+        elif ch == '"':
+            in_string = True
+    return "".join(out)
+
+
+def _sub_outside_strings(pattern: str, repl: str, text: str) -> str:
+    # Match against the masked copy so string contents are never edited
+    pieces = []
+    last = 0
+    for match in re.finditer(pattern, _mask_strings(text)):
+        pieces.append(text[last:match.start()])
+        pieces.append(match.expand(repl))
+        last = match.end()
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
+def _fix_commas(text: str) -> str:
+    # Trailing commas before a closing bracket
+    text = _sub_outside_strings(r",(\s*[}\]])", r"\1", text)
+    # Missing commas between adjacent objects, arrays or strings on new lines
+    text = _sub_outside_strings(r"([}\]])(\s*)([{\[])", r"\1,\2\3", text)
+    text = _sub_outside_strings(r'("|\d|true|false|null|[}\]])(\s*\n\s*)(")', r"\1,\2\3", text)
+    return text
+
+
+def _close_truncated(text: str) -> str:
+    """Cut a truncated document after its last complete value and close it.
+
+    Whole questions are kept; a half-written trailing question is dropped.
+    """
+    stack = []
+    last_complete = None  # (position, stack) after the last closed object/array
+
+    # Brackets inside strings are blanked out by the mask
+    for i, ch in enumerate(_mask_strings(text)):
+        if ch in "{[":
+            stack.append(ch)
+        elif ch in "}]":
+            if not stack:
+                return text[:i]
+            stack.pop()
+            if not stack:
+                return text[:i + 1]
+            last_complete = (i + 1, list(stack))
+
+    if not stack:
+        return text
+    if last_complete is None:
+        return text
+
+    position, open_brackets = last_complete
+    head = text[:position].rstrip().rstrip(",")
+    return head + "".join(_CLOSERS[b] for b in reversed(open_brackets))
+
+
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def repair_json(text: str) -> str | None:
+    """Try cheap rule-based fixes; return parseable JSON text or None"""
+    candidate = _strip_wrapping(text)
+    if _loads(candidate) is not None:
+        return candidate
+
+    for fix in (_normalise_quotes, _fix_commas, _close_truncated):
+        candidate = fix(candidate)
+        if _loads(candidate) is not None:
+            return candidate
+
+    # Truncation can leave a dangling comma that only the comma pass removes
+    candidate = _fix_commas(candidate)
+    if _loads(candidate) is not None:
+        return candidate
+    return None
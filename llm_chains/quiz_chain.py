@@ -1,8 +1,13 @@
 from typing import Literal
+import asyncio
 import json
 import re
-from langchain_community.chat_models import ChatOllama
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
 from .base_chain import BaseChain
+from .json_repair import repair_json
+from .quiz_stream_parser import QuizStreamParser
 
 QuizType = Literal["mcq", "short_answer", "true_false"]
 COMMON_FIELDS = {"id", "type", "prompt", "grading", "explanation"}
@@ -19,9 +24,25 @@ class ContentError(Exception):
 
 class QuizChain(BaseChain):
 
-    def __init__(self, retriever, model: str = "llama3.2:3b", temperature: float = 0.1):
+    def __init__(
+            self,
+            retriever,
+            model: str = "llama3.2:3b",
+            temperature: float = 0.1,
+            response_cache=None,
+            question_bank=None,
+    ):
         self.retriever = retriever
-        self.llm = ChatOllama(model=model, temperature=temperature)
+        self.model = model
+        self.temperature = temperature
+        self.response_cache = response_cache
+        self.question_bank = question_bank
+        # How often broken JSON was fixed locally vs. by another LLM call
+        self.repair_stats = {"local": 0, "llm": 0}
+
+    def _make_llm(self):
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=self.model, temperature=self.temperature)
 
     def _question_schema(self, quiz_type: str) -> str:
         if quiz_type == "mcq":
@@ -92,17 +113,14 @@ class QuizChain(BaseChain):
         }}
         """
 
-    def run(
+    def _build_prompt(
             self,
             topic: str,
-            num_questions: int = 5,
-            quiz_type: QuizType = "true_false",
-            difficulty: str = "intermediate",
-            top_k: int = 3,
-    ) -> dict:
-        context_chucks = self.retriever.retrieve(topic, top_k=top_k)
-        context = "\n\n".join(context_chucks)
-        
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+    ) -> str:
         extra_rules = ""
         if quiz_type == "mcq":
             extra_rules = """
@@ -161,8 +179,125 @@ CONTEXT:
 TOPIC: {topic}
 
 Generate the quiz now:"""
+        return prompt
+
+    def run(
+            self,
+            topic: str,
+            num_questions: int = 5,
+            quiz_type: QuizType = "true_false",
+            difficulty: str = "intermediate",
+            top_k: int = 3,
+            parallel: bool = False,
+            group_size: int = 1,
+            max_workers: int = 4,
+            use_cache: bool = True,
+            use_bank: bool = True,
+            documents: tuple[list[str], list[dict]] | None = None,
+    ) -> dict:
+        """Serve what the question bank has and generate only the missing questions.
+
+        documents are pre-retrieved (texts, metadatas) for the topic, e.g.
+        from a batched retrieve_documents_many; None retrieves them here.
+        """
+        banked = self._bank_sample(topic, quiz_type, difficulty, num_questions, use_bank)
+        missing = num_questions - len(banked)
+        if missing == 0:
+            print("✓ Served from question bank")
+            quiz = self._assemble_quiz(banked, num_questions, quiz_type, difficulty, 0)
+            self._mark_served(banked, quiz_type)
+            return quiz
+
+        data, context = self._generate(
+            topic, missing, quiz_type, difficulty, top_k,
+            parallel, group_size, max_workers, use_cache, documents,
+        )
+        self._store(topic, data, quiz_type, difficulty)
+        if not banked:
+            return data
+
+        questions = self._merge_banked(banked, data, num_questions)
+        if len(questions) < num_questions:
+            # A fresh question repeated a banked one; request only the difference
+            quiz = self._fill_questions(
+                questions, topic, context, num_questions, quiz_type, difficulty, group_size, max_workers
+            )
+            self._store(topic, quiz, quiz_type, difficulty)
+        else:
+            quiz = self._assemble_quiz(questions, num_questions, quiz_type, difficulty, 1)
+        quiz["source_chunks"] = data.get("source_chunks", [])
+        self._mark_served(banked, quiz_type)
+        return quiz
+
+    def _generate(
+            self,
+            topic: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            top_k: int,
+            parallel: bool,
+            group_size: int,
+            max_workers: int,
+            use_cache: bool,
+            documents: tuple[list[str], list[dict]] | None = None,
+    ) -> dict:
+        context_chucks, metadatas = documents or self._retrieve_documents(topic, top_k)
+        context = self._pack(context_chucks, metadatas)
+        prompt = self._build_prompt(topic, context, num_questions, quiz_type, difficulty)
+
+        cached = self._cache_get(prompt, use_cache)
+        if cached is not None:
+            print("✓ Served from response cache")
+            return json.loads(cached), context
+
+        if parallel:
+            data = self._run_parallel(
+                topic, context, num_questions, quiz_type, difficulty, group_size, max_workers
+            )
+        else:
+            data = self._run_sequential(
+                prompt, topic, context, num_questions, quiz_type, difficulty, max_workers
+            )
+
+        data["source_chunks"] = [m["chunk_id"] for m in metadatas if m.get("chunk_id")]
+        self._cache_put(prompt, json.dumps(data), use_cache)
+        return data, context
+
+    def _bank_sample(self, topic, quiz_type, difficulty, num_questions, use_bank) -> list[dict]:
+        if not use_bank or self.question_bank is None:
+            return []
+        return self.question_bank.sample(topic, quiz_type, difficulty, num_questions)
+
+    def _store(self, topic, data, quiz_type, difficulty):
+        # Stored even when use_bank is off, so bulk jobs can fill the bank
+        if self.question_bank is not None:
+            self.question_bank.add_quiz(topic, data, quiz_type, difficulty)
+
+    def _mark_served(self, banked, quiz_type):
+        # Counted only once the quiz is actually returned
+        if banked and self.question_bank is not None:
+            self.question_bank.mark_served(banked, quiz_type)
+
+    def _merge_banked(self, banked, data, num_questions) -> list[dict]:
+        """Banked questions first, then fresh ones that do not repeat them"""
+        questions = []
+        self._collect_questions(questions, set(), banked + data["questions"], num_questions)
+        return questions
+
+    def _run_sequential(
+            self,
+            prompt: str,
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            max_workers: int = 1,
+    ) -> dict:
         MAX_RETRIES = 3
         raw = None
+        repaired_locally = False
 
         for attempt in range(MAX_RETRIES):
             print(f"\n{'='*60}")
@@ -172,44 +307,37 @@ Generate the quiz now:"""
             if raw is None:
                 print("Invoking LLM...")
                 raw = self.llm.invoke(prompt).content
-                print(f"\nRaw Response (first 800 chars):")
-                print("-" * 60)
-                print(raw[:800])
-                print("-" * 60)
+                repaired_locally = False
+                self._print_raw(raw)
 
             try:
-                # Clean the response
-                cleaned = self._clean_llm_response(raw)
-                
-                # Parse JSON
-                data = json.loads(cleaned)
-                print(f"✓ JSON parsed successfully")
-                
-                # Auto-fix common issues
-                self._auto_fix_common_issues(data)
-                print(f"✓ Auto-fixes applied")
-                
-                # Validate
-                self._validate_quiz(data, quiz_type, num_questions)
-                print(f"✓ Validation passed")
-                print(f"\n{'='*60}")
-                print(f"SUCCESS! Generated {len(data['questions'])} questions")
-                print(f"{'='*60}\n")
-                
+                data = self._parse_quiz(raw, quiz_type, num_questions)
+                if repaired_locally:
+                    self.repair_stats["local"] += 1
                 return data
                 
-            except json.JSONDecodeError as e:
-                print(f"✗ JSON Decode Error: {e}")
+            except (json.JSONDecodeError, StructureError) as e:
+                print(f"✗ {type(e).__name__}: {e}")
                 print(f"  Attempting repair...")
-                raw = self._repair_json(raw, quiz_type, num_questions)
-                
-            except StructureError as e:
-                print(f"✗ Structure Error: {e}")
-                print(f"  Attempting repair...")
-                raw = self._repair_json(raw, quiz_type, num_questions)
+                repaired = self._local_repair(raw)
+                if repaired is None:
+                    raw = self._llm_repair(raw, quiz_type, num_questions)
+                else:
+                    raw = repaired
+                    repaired_locally = True
                 
             except ContentError as e:
                 print(f"✗ Content Error: {e}")
+                # e.g. a truncated response cut back to its complete questions
+                kept = self._parse_group(raw, num_questions, quiz_type, 1)
+                if kept:
+                    if repaired_locally:
+                        self.repair_stats["local"] += 1
+                    print(f"  Keeping {len(kept)} valid question(s), generating the rest...")
+                    return self._fill_questions(
+                        kept, topic, context, num_questions, quiz_type, difficulty,
+                        num_questions - len(kept), max_workers,
+                    )
                 print(f"  Starting fresh...")
                 raw = None
                 
@@ -224,6 +352,463 @@ Generate the quiz now:"""
             f"(3) checking if context is relevant to topic"
         )
 
+    async def arun(
+            self,
+            topic: str,
+            num_questions: int = 5,
+            quiz_type: QuizType = "true_false",
+            difficulty: str = "intermediate",
+            top_k: int = 3,
+            parallel: bool = False,
+            group_size: int = 1,
+            use_cache: bool = True,
+            use_bank: bool = True,
+            documents: tuple[list[str], list[dict]] | None = None,
+    ) -> dict:
+        """Async counterpart of run; LLM concurrency is bounded per model"""
+        loop = asyncio.get_running_loop()
+        banked = await loop.run_in_executor(
+            None, self._bank_sample, topic, quiz_type, difficulty, num_questions, use_bank
+        )
+        missing = num_questions - len(banked)
+        if missing == 0:
+            quiz = self._assemble_quiz(banked, num_questions, quiz_type, difficulty, 0)
+            await loop.run_in_executor(None, self._mark_served, banked, quiz_type)
+            return quiz
+
+        context_chucks, metadatas = documents or await self._aretrieve_documents(topic, top_k)
+        context = self._pack(context_chucks, metadatas)
+        prompt = self._build_prompt(topic, context, missing, quiz_type, difficulty)
+
+        cached = self._cache_get(prompt, use_cache)
+        if cached is not None:
+            data = json.loads(cached)
+        else:
+            if parallel:
+                data = await self._arun_parallel(
+                    topic, context, missing, quiz_type, difficulty, group_size
+                )
+            else:
+                data = await self._arun_sequential(
+                    prompt, topic, context, missing, quiz_type, difficulty
+                )
+            data["source_chunks"] = [m["chunk_id"] for m in metadatas if m.get("chunk_id")]
+            self._cache_put(prompt, json.dumps(data), use_cache)
+
+        await loop.run_in_executor(None, self._store, topic, data, quiz_type, difficulty)
+        if not banked:
+            return data
+
+        questions = self._merge_banked(banked, data, num_questions)
+        if len(questions) < num_questions:
+            # A fresh question repeated a banked one; request only the difference
+            quiz = await self._afill_questions(
+                questions, topic, context, num_questions, quiz_type, difficulty, group_size
+            )
+            await loop.run_in_executor(None, self._store, topic, quiz, quiz_type, difficulty)
+        else:
+            quiz = self._assemble_quiz(questions, num_questions, quiz_type, difficulty, 1)
+        quiz["source_chunks"] = data.get("source_chunks", [])
+        await loop.run_in_executor(None, self._mark_served, banked, quiz_type)
+        return quiz
+
+    async def _arun_sequential(
+            self,
+            prompt: str,
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+    ) -> dict:
+        MAX_RETRIES = 3
+        raw = None
+        repaired_locally = False
+
+        for attempt in range(MAX_RETRIES):
+            print(f"ATTEMPT {attempt + 1}/{MAX_RETRIES}")
+            if raw is None:
+                raw = await self._ainvoke(prompt)
+                repaired_locally = False
+
+            try:
+                data = self._parse_quiz(raw, quiz_type, num_questions)
+                if repaired_locally:
+                    self.repair_stats["local"] += 1
+                return data
+
+            except (json.JSONDecodeError, StructureError) as e:
+                print(f"✗ {type(e).__name__}: {e}")
+                print(f"  Attempting repair...")
+                repaired = self._local_repair(raw)
+                if repaired is None:
+                    self.repair_stats["llm"] += 1
+                    repaired = await self._ainvoke(self._repair_prompt(raw, quiz_type, num_questions))
+                else:
+                    repaired_locally = True
+                raw = repaired
+
+            except ContentError as e:
+                print(f"✗ Content Error: {e}")
+                kept = self._parse_group(raw, num_questions, quiz_type, 1)
+                if kept:
+                    if repaired_locally:
+                        self.repair_stats["local"] += 1
+                    print(f"  Keeping {len(kept)} valid question(s), generating the rest...")
+                    return await self._afill_questions(
+                        kept, topic, context, num_questions, quiz_type, difficulty,
+                        num_questions - len(kept),
+                    )
+                print(f"  Starting fresh...")
+                raw = None
+
+            except Exception as e:
+                print(f"✗ {type(e).__name__}: {e}")
+                print(f"  Starting fresh...")
+                raw = None
+
+        raise RuntimeError(
+            f"Failed to generate valid quiz after {MAX_RETRIES} attempts. "
+            f"Try: (1) reducing num_questions, (2) using simpler quiz_type, "
+            f"(3) checking if context is relevant to topic"
+        )
+
+    def stream_questions(
+            self,
+            topic: str,
+            num_questions: int = 5,
+            quiz_type: QuizType = "true_false",
+            difficulty: str = "intermediate",
+            top_k: int = 3,
+    ) -> Iterator[dict]:
+        """Yield validated questions as soon as each one closes in the stream.
+
+        Generation is aborted at the first invalid question and a new
+        attempt asks only for the questions still missing.
+        """
+        context_chucks, metadatas = self._retrieve_documents(topic, top_k)
+        context = self._pack(context_chucks, metadatas)
+
+        MAX_RETRIES = 3
+        emitted = []
+        seen_prompts = set()
+
+        for attempt in range(MAX_RETRIES):
+            missing = num_questions - len(emitted)
+            prompt = self._build_prompt(topic, context, missing, quiz_type, difficulty)
+            parser = QuizStreamParser()
+            tokens = self._stream(prompt)
+            try:
+                for token in tokens:
+                    for q in parser.feed(token):
+                        q = self._accept_streamed_question(q, quiz_type, emitted, seen_prompts)
+                        if q is None:
+                            continue
+                        yield q
+                        if len(emitted) == num_questions:
+                            return
+            except (json.JSONDecodeError, StructureError, ContentError) as e:
+                print(f"✗ Attempt {attempt + 1}/{MAX_RETRIES}: aborting generation: {e}")
+            finally:
+                tokens.close()
+
+        raise RuntimeError(
+            f"Failed to stream {num_questions} valid questions after {MAX_RETRIES} attempts "
+            f"(got {len(emitted)})"
+        )
+
+    async def astream_questions(
+            self,
+            topic: str,
+            num_questions: int = 5,
+            quiz_type: QuizType = "true_false",
+            difficulty: str = "intermediate",
+            top_k: int = 3,
+    ) -> AsyncIterator[dict]:
+        context_chucks, metadatas = await self._aretrieve_documents(topic, top_k)
+        context = self._pack(context_chucks, metadatas)
+
+        MAX_RETRIES = 3
+        emitted = []
+        seen_prompts = set()
+
+        for attempt in range(MAX_RETRIES):
+            missing = num_questions - len(emitted)
+            prompt = self._build_prompt(topic, context, missing, quiz_type, difficulty)
+            parser = QuizStreamParser()
+            tokens = self._astream(prompt)
+            try:
+                async for token in tokens:
+                    for q in parser.feed(token):
+                        q = self._accept_streamed_question(q, quiz_type, emitted, seen_prompts)
+                        if q is None:
+                            continue
+                        yield q
+                        if len(emitted) == num_questions:
+                            return
+            except (json.JSONDecodeError, StructureError, ContentError) as e:
+                print(f"✗ Attempt {attempt + 1}/{MAX_RETRIES}: aborting generation: {e}")
+            finally:
+                await tokens.aclose()
+
+        raise RuntimeError(
+            f"Failed to stream {num_questions} valid questions after {MAX_RETRIES} attempts "
+            f"(got {len(emitted)})"
+        )
+
+    def _accept_streamed_question(self, q, quiz_type, emitted: list, seen_prompts: set):
+        """Fix and validate one streamed question; None if it is a duplicate"""
+        self._auto_fix_common_issues({"questions": [q]})
+        self._validate_question(q, quiz_type)
+
+        key = q["prompt"].strip().lower()
+        if key in seen_prompts:
+            return None
+        seen_prompts.add(key)
+        emitted.append(q)
+        q["id"] = len(emitted)
+        return q
+
+    def _print_raw(self, raw: str):
+        print(f"\nRaw Response (first 800 chars):")
+        print("-" * 60)
+        print(raw[:800])
+        print("-" * 60)
+
+    def _parse_quiz(self, raw: str, quiz_type: str, num_questions: int) -> dict:
+        """Clean, parse, auto-fix and validate a full quiz response"""
+        # Clean the response
+        cleaned = self._clean_llm_response(raw)
+        
+        # Parse JSON
+        data = json.loads(cleaned)
+        print(f"✓ JSON parsed successfully")
+        
+        # Auto-fix common issues
+        self._auto_fix_common_issues(data)
+        print(f"✓ Auto-fixes applied")
+        
+        # Validate
+        self._validate_quiz(data, quiz_type, num_questions)
+        print(f"✓ Validation passed")
+        print(f"\n{'='*60}")
+        print(f"SUCCESS! Generated {len(data['questions'])} questions")
+        print(f"{'='*60}\n")
+        
+        return data
+
+    def _group_prompt(
+            self,
+            topic: str,
+            context: str,
+            count: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_index: int,
+            num_groups: int,
+    ) -> str:
+        prompt = self._build_prompt(topic, context, count, quiz_type, difficulty)
+        if num_groups > 1:
+            prompt += (
+                f"\n(This is question set {group_index} of {num_groups}; "
+                f"cover different facts than the other sets.)"
+            )
+        return prompt
+
+    def _parse_group(self, raw: str, count: int, quiz_type: QuizType, group_index: int) -> list[dict]:
+        """Return only the valid questions of one group response"""
+        try:
+            data = json.loads(self._clean_llm_response(raw))
+        except json.JSONDecodeError as e:
+            repaired = self._local_repair(raw)
+            if repaired is None:
+                print(f"✗ Set {group_index}: JSON Decode Error: {e}")
+                return []
+            data = json.loads(repaired)
+            repaired_locally = True
+        else:
+            repaired_locally = False
+
+        self._auto_fix_common_issues(data)
+        questions = data.get("questions") if isinstance(data, dict) else None
+        if not isinstance(questions, list):
+            print(f"✗ Set {group_index}: response has no questions array")
+            return []
+
+        valid = []
+        for q in questions[:count]:
+            try:
+                self._validate_question(q, quiz_type)
+                valid.append(q)
+            except (StructureError, ContentError) as e:
+                print(f"✗ Set {group_index}: dropped question: {e}")
+        # Counted only when the repaired response gave usable questions
+        if repaired_locally and valid:
+            self.repair_stats["local"] += 1
+        return valid
+
+    def _generate_group(
+            self,
+            topic: str,
+            context: str,
+            count: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_index: int,
+            num_groups: int,
+    ) -> list[dict]:
+        """Generate one small group of questions and return only the valid ones"""
+        prompt = self._group_prompt(
+            topic, context, count, quiz_type, difficulty, group_index, num_groups
+        )
+        return self._parse_group(self.llm.invoke(prompt).content, count, quiz_type, group_index)
+
+    async def _agenerate_group(
+            self,
+            topic: str,
+            context: str,
+            count: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_index: int,
+            num_groups: int,
+    ) -> list[dict]:
+        prompt = self._group_prompt(
+            topic, context, count, quiz_type, difficulty, group_index, num_groups
+        )
+        return self._parse_group(await self._ainvoke(prompt), count, quiz_type, group_index)
+
+    def _plan_groups(self, missing: int, group_size: int) -> list[int]:
+        groups = [group_size] * (missing // group_size)
+        if missing % group_size:
+            groups.append(missing % group_size)
+        return groups
+
+    def _collect_questions(self, questions: list, seen_prompts: set, new: list[dict], num_questions: int):
+        for q in new:
+            key = q["prompt"].strip().lower()
+            if key in seen_prompts or len(questions) >= num_questions:
+                continue
+            seen_prompts.add(key)
+            questions.append(q)
+
+    def _assemble_quiz(self, questions: list, num_questions: int, quiz_type: QuizType, difficulty: str, max_retries: int) -> dict:
+        if len(questions) < num_questions:
+            raise RuntimeError(
+                f"Failed to generate {num_questions} valid questions after {max_retries} attempts "
+                f"(got {len(questions)}). Try: (1) reducing num_questions, "
+                f"(2) checking if context is relevant to topic"
+            )
+
+        # Assemble the quiz with sequential ids
+        for i, q in enumerate(questions, 1):
+            q["id"] = i
+        data = {
+            "quiz_id": f"quiz_{uuid.uuid4().hex[:8]}",
+            "difficulty": difficulty,
+            "quiz_type": quiz_type,
+            "questions": questions,
+        }
+        self._validate_quiz(data, quiz_type, num_questions)
+        print(f"SUCCESS! Generated {num_questions} questions")
+        return data
+
+    def _run_parallel(
+            self,
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_size: int,
+            max_workers: int,
+    ) -> dict:
+        """Generate questions in small concurrent groups, regenerating only what failed"""
+        return self._fill_questions(
+            [], topic, context, num_questions, quiz_type, difficulty, group_size, max_workers
+        )
+
+    def _fill_questions(
+            self,
+            kept: list[dict],
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_size: int,
+            max_workers: int,
+    ) -> dict:
+        """Top kept questions up to num_questions, requesting only the missing ones"""
+        MAX_RETRIES = 3
+        questions = []
+        seen_prompts = set()
+        self._collect_questions(questions, seen_prompts, kept, num_questions)
+
+        for attempt in range(MAX_RETRIES):
+            missing = num_questions - len(questions)
+            if missing == 0:
+                break
+
+            groups = self._plan_groups(missing, group_size)
+            print(f"ATTEMPT {attempt + 1}/{MAX_RETRIES}: {missing} question(s) in {len(groups)} set(s)")
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futures = [
+                    pool.submit(
+                        self._generate_group,
+                        topic, context, count, quiz_type, difficulty, i, len(groups)
+                    )
+                    for i, count in enumerate(groups, 1)
+                ]
+                for future in futures:
+                    self._collect_questions(questions, seen_prompts, future.result(), num_questions)
+
+        return self._assemble_quiz(questions, num_questions, quiz_type, difficulty, MAX_RETRIES)
+
+    async def _arun_parallel(
+            self,
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_size: int,
+    ) -> dict:
+        return await self._afill_questions(
+            [], topic, context, num_questions, quiz_type, difficulty, group_size
+        )
+
+    async def _afill_questions(
+            self,
+            kept: list[dict],
+            topic: str,
+            context: str,
+            num_questions: int,
+            quiz_type: QuizType,
+            difficulty: str,
+            group_size: int,
+    ) -> dict:
+        MAX_RETRIES = 3
+        questions = []
+        seen_prompts = set()
+        self._collect_questions(questions, seen_prompts, kept, num_questions)
+
+        for attempt in range(MAX_RETRIES):
+            missing = num_questions - len(questions)
+            if missing == 0:
+                break
+
+            groups = self._plan_groups(missing, group_size)
+            print(f"ATTEMPT {attempt + 1}/{MAX_RETRIES}: {missing} question(s) in {len(groups)} set(s)")
+            results = await asyncio.gather(*(
+                self._agenerate_group(topic, context, count, quiz_type, difficulty, i, len(groups))
+                for i, count in enumerate(groups, 1)
+            ))
+            for result in results:
+                self._collect_questions(questions, seen_prompts, result, num_questions)
+
+        return self._assemble_quiz(questions, num_questions, quiz_type, difficulty, MAX_RETRIES)
+
     def _clean_llm_response(self, raw: str) -> str:
         """Remove markdown code blocks and other formatting"""
         # Remove markdown code blocks
@@ -344,21 +929,23 @@ Generate the quiz now:"""
         if not q.get("sample_answer") or not q["sample_answer"].strip():
             raise ContentError("Short answer must have a sample_answer")
 
+    def _validate_question(self, q, quiz_type):
+        self._validate_common_question_fields(q, quiz_type)
+
+        if quiz_type == "mcq":
+            self._validate_mcq(q)
+        elif quiz_type == "true_false":
+            self._validate_true_false(q)
+        elif quiz_type == "short_answer":
+            self._validate_short_answer(q)
+
     def _validate_quiz(self, data, quiz_type, num_questions):
         self._validate_root_keys(data)
         self._validate_num_questions(data, num_questions)
 
         for i, q in enumerate(data["questions"], 1):
             try:
-                self._validate_common_question_fields(q, quiz_type)
-
-                if quiz_type == "mcq":
-                    self._validate_mcq(q)
-                elif quiz_type == "true_false":
-                    self._validate_true_false(q)
-                elif quiz_type == "short_answer":
-                    self._validate_short_answer(q)
-                    
+                self._validate_question(q, quiz_type)
             except (StructureError, ContentError) as e:
                 raise type(e)(f"Question {i}: {str(e)}")
         
@@ -416,9 +1003,8 @@ Generate the quiz now:"""
                 except (ValueError, TypeError):
                     pass
 
-    def _repair_json(self, broken_json: str, quiz_type: str, num_questions: int) -> str:
-        """Ask LLM to repair malformed JSON"""
-        repair_prompt = f"""You are a JSON repair assistant. Your ONLY job is to fix JSON syntax errors.
+    def _repair_prompt(self, broken_json: str, quiz_type: str, num_questions: int) -> str:
+        return f"""You are a JSON repair assistant. Your ONLY job is to fix JSON syntax errors.
 
 RULES:
 - Fix ONLY JSON structure and syntax errors (missing commas, quotes, brackets, etc.)
@@ -437,6 +1023,24 @@ BROKEN JSON:
 {broken_json}
 
 REPAIRED JSON:"""
-        
+
+    def _local_repair(self, broken_json: str) -> str | None:
+        """Rule-based repair of unparseable JSON; None if it cannot help"""
+        try:
+            json.loads(self._clean_llm_response(broken_json))
+            # Already valid JSON, so the problem is structural
+            return None
+        except json.JSONDecodeError:
+            pass
+
+        repaired = repair_json(broken_json)
+        if repaired is not None:
+            print("✓ JSON repaired locally")
+        return repaired
+
+    def _llm_repair(self, broken_json: str, quiz_type: str, num_questions: int) -> str:
+        """Ask the LLM to repair JSON that local repair could not fix"""
+        self.repair_stats["llm"] += 1
+        repair_prompt = self._repair_prompt(broken_json, quiz_type, num_questions)
         print("Asking LLM to repair JSON...")
-        return self.llm.invoke(repair_prompt).content
\ No newline at end of file
+        return self.llm.invoke(repair_prompt).content
@@ -1,7 +1,6 @@
 from typing import Literal
 import json
 import re
-from langchain_community.chat_models import ChatOllama
 from .base_chain import BaseChain
 
 QuizType = Literal["mcq", "short_answer", "true_false"]
@@ -21,7 +20,12 @@ class QuizChain(BaseChain):
 
     def __init__(self, retriever, model: str = "llama3.2:3b", temperature: float = 0.1):
         self.retriever = retriever
-        self.llm = ChatOllama(model=model, temperature=temperature)
+        self.model = model
+        self.temperature = temperature
+
+    def _make_llm(self):
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=self.model, temperature=self.temperature)
 
     def _question_schema(self, quiz_type: str) -> str:
         if quiz_type == "mcq":
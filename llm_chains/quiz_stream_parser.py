@@ -0,0 +1,71 @@
+import json
+
+class QuizStreamParser:
+    """Incrementally scan a streamed quiz response for question objects.
+
+    feed() takes the next piece of model output and returns every question
+    object of the top-level "questions" array that closed in it, already
+    decoded. Text before the first "{" (markdown fences, chatter) is ignored.
+    Raises json.JSONDecodeError if a closed question is not valid JSON.
+    """
+
+    def __init__(self):
+        self.data = ""
+        self.pos = 0
+        self.stack = []
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None
+        self.last_key = None
+        self.in_questions = False
+        self.question_start = None
+        self.done = False
+
+    def feed(self, text: str) -> list[dict]:
+        questions = []
+        self.data += text
+        data = self.data
+
+        while self.pos < len(data):
+            ch = data[self.pos]
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if len(self.stack) == 1:
+                        self.last_string = data[self.string_start + 1:self.pos]
+            elif not self.stack:
+                # Outside the quiz object only an opening brace matters
+                if ch == "{" and not self.done:
+                    self.stack.append("{")
+            elif ch == '"':
+                self.in_string = True
+                self.string_start = self.pos
+            elif ch == ":" and len(self.stack) == 1:
+                self.last_key = self.last_string
+            elif ch == "," and len(self.stack) == 1:
+                self.last_key = None
+            elif ch in "{[":
+                if ch == "[" and self.stack == ["{"] and self.last_key == "questions":
+                    self.in_questions = True
+                elif ch == "{" and self.in_questions and len(self.stack) == 2:
+                    self.question_start = self.pos
+                self.stack.append(ch)
+            elif ch in "}]":
+                self.stack.pop()
+                if ch == "}" and self.in_questions and len(self.stack) == 2 and self.question_start is not None:
+                    questions.append(json.loads(data[self.question_start:self.pos + 1]))
+                    self.question_start = None
+                elif ch == "]" and self.in_questions and len(self.stack) == 1:
+                    self.in_questions = False
+                elif not self.stack:
+                    self.done = True
+
+            self.pos += 1
+
+        return questions
@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+class SemanticCache:
+    """Serve answers for topics that are phrased differently but mean the same.
+
+    Topics are embedded with the subject's BaseEmbedder and compared by
+    cosine similarity against earlier topics of the same subject and
+    namespace (chain, model and options). A match at or above threshold
+    returns the stored answer without calling the LLM.
+
+    Every lookup scores all entries of its namespace, so each namespace
+    keeps at most max_entries, evicting the least recently used; entries
+    also expire after ttl_seconds. Storing a topic again replaces it.
+    """
+
+    def __init__(
+            self,
+            embedder,
+            subject_id: str,
+            path: str = "./db/semantic_cache.sqlite3",
+            threshold: float = 0.9,
+            ttl_seconds: float | None = 7 * 24 * 3600,
+            max_entries: int = 500,
+    ):
+        self.embedder = embedder
+        self.subject_id = subject_id
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS semantic_entries (
+                   id INTEGER PRIMARY KEY,
+                   subject_id TEXT NOT NULL,
+                   namespace TEXT NOT NULL,
+                   topic TEXT NOT NULL,
+                   vector BLOB NOT NULL,
+                   response TEXT NOT NULL,
+                   created REAL NOT NULL,
+                   last_used REAL
+               )"""
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(semantic_entries)")]
+        if "last_used" not in columns:
+            self._conn.execute("ALTER TABLE semantic_entries ADD COLUMN last_used REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_semantic_subject "
+            "ON semantic_entries (subject_id, namespace)"
+        )
+        self._conn.commit()
+
+    def _embed(self, topic: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.embed_query(topic), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, namespace: str, topic: str) -> str | None:
+        query = self._embed(topic)
+        now = time.time()
+        oldest = now - self.ttl_seconds if self.ttl_seconds is not None else 0.0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, vector, response FROM semantic_entries "
+                "WHERE subject_id = ? AND namespace = ? AND created >= ?",
+                (self.subject_id, namespace, oldest),
+            ).fetchall()
+
+            if rows:
+                vectors = np.stack([np.frombuffer(blob, dtype=np.float32) for _, blob, _ in rows])
+                scores = vectors @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    self._conn.execute(
+                        "UPDATE semantic_entries SET last_used = ? WHERE id = ?", (now, rows[best][0])
+                    )
+                    self._conn.commit()
+                    return rows[best][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, topic: str, response: str):
+        vector = self._embed(topic)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM semantic_entries WHERE subject_id = ? AND namespace = ? AND topic = ?",
+                (self.subject_id, namespace, topic),
+            )
+            self._conn.execute(
+                "INSERT INTO semantic_entries "
+                "(subject_id, namespace, topic, vector, response, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.subject_id, namespace, topic, vector.tobytes(), response, now, now),
+            )
+            self._evict(namespace, now)
+            self._conn.commit()
+
+    def _evict(self, namespace: str, now: float):
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM semantic_entries WHERE created < ?", (now - self.ttl_seconds,)
+            )
+        (count,) = self._conn.execute(
+            "SELECT COUNT(*) FROM semantic_entries WHERE subject_id = ? AND namespace = ?",
+            (self.subject_id, namespace),
+        ).fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            # Entries from before last_used was tracked count as least recent
+            self._conn.execute(
+                "DELETE FROM semantic_entries WHERE id IN ("
+                "SELECT id FROM semantic_entries WHERE subject_id = ? AND namespace = ? "
+                "ORDER BY COALESCE(last_used, created) LIMIT ?)",
+                (self.subject_id, namespace, overflow),
+            )
+
+    def invalidate(self, subject_id: str | None = None):
+        """Forget every answer of a subject, e.g. after it is re-ingested"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM semantic_entries WHERE subject_id = ?",
+                (subject_id or self.subject_id,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute(
+                "SELECT COUNT(*) FROM semantic_entries WHERE subject_id = ?",
+                (self.subject_id,),
+            ).fetchone()
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": size,
+            "threshold": self.threshold,
+            "max_entries": self.max_entries,
+        }
+
+    def close(self):
+        self._conn.close()
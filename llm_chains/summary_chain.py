@@ -1,23 +1,36 @@
-from langchain_community.chat_models import ChatOllama
-from .base_chain import BaseChain
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator
+from .base_chain import BaseChain, StreamTimings
+from .context_packer import estimate_tokens, pack_chunks, split_to_budget
 
 class SummaryChain(BaseChain):
     "build a structured cheat sheet"
 
-    def __init__(self, retriever, model: str = "mistral", temperature: float = 0.1):
-        self.retriever = retriever
-        self.llm = ChatOllama(model=model, temperature=temperature)
-        
-    def run(
+    def __init__(
             self,
-            topic: str,
-            style: str ="cheat_sheet",
-            top_k: int = 8,
-    ) -> str:
+            retriever,
+            model: str = "mistral",
+            temperature: float = 0.1,
+            response_cache=None,
+            semantic_cache=None,
+            summary_queue=None,
+    ):
+        self.retriever = retriever
+        self.model = model
+        self.temperature = temperature
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        # SummaryJobQueue with section summaries precomputed at ingest time
+        self.summary_queue = summary_queue
+
+    def _make_llm(self):
+        from langchain_community.chat_models import ChatOllama
+        return ChatOllama(model=self.model, temperature=self.temperature)
         
-        context_chunks = self.retriever.retrieve(topic, top_k=top_k)
-        context = "\n\n".join(context_chunks)
-        prompt = f"""
+    def _build_prompt(self, topic: str, context: str, style: str) -> str:
+        return f"""
                     You are a study assistant. Create a high-quality summary using ONLY the context below.
                     Do not invent facts.
 
@@ -37,4 +50,311 @@ class SummaryChain(BaseChain):
 
                     Cheat Sheet:
                     """
-        return self.llm.invoke(prompt).content
\ No newline at end of file
+
+    def _map_prompt(self, topic: str, context: str) -> str:
+        return f"""
+                    You are a study assistant. From the context below, extract the facts,
+                    definitions, steps and formulas that matter for the topic.
+                    Do not invent facts. Use short bullet points.
+
+                    Topic: {topic}
+
+                    Context:
+                    {context}
+
+                    Notes:
+                    """
+
+    def _reduce_prompt(self, topic: str, notes: str) -> str:
+        return f"""
+                    You are a study assistant. Merge the notes below into one set of notes
+                    for the topic. Keep every distinct fact, definition, step and formula;
+                    only remove repetition. Use short bullet points.
+
+                    Topic: {topic}
+
+                    Notes:
+                    {notes}
+
+                    Merged notes:
+                    """
+
+    def _groups(self, context_chunks: list[str], group_size: int,
+                metadatas: list[dict] | None = None) -> list[str]:
+        # Neighbours are merged before grouping; each group is then budgeted
+        chunks = pack_chunks(context_chunks, metadatas)
+        return [
+            self._pack(chunks[i:i + group_size])
+            for i in range(0, len(chunks), group_size)
+        ]
+
+    def _note_groups(self, notes: list[str]) -> list[str]:
+        """Consecutive notes joined into groups that fit the budget, two at least"""
+        budget = self._budget()
+        groups = []
+        for note in notes:
+            last = groups[-1] if groups else None
+            if last and (len(last) < 2 or estimate_tokens("\n\n".join(last + [note])) <= budget):
+                last.append(note)
+            else:
+                groups.append([note])
+        if len(groups) > 1 and len(groups[-1]) < 2:
+            groups[-2].extend(groups.pop())
+        return ["\n\n".join(group) for group in groups]
+
+    def _fits(self, notes: list[str]) -> bool:
+        return estimate_tokens("\n\n".join(notes)) <= self._budget()
+
+    def _map_notes(self, topic: str, context_chunks: list[str], group_size: int, max_workers: int,
+                   metadatas: list[dict] | None = None) -> str:
+        """Summarise chunk groups in parallel, then merge the notes in stages.
+
+        Notes that do not fit the budget together are reduced again in
+        groups until they do, so no group's notes are dropped.
+        """
+        groups = self._groups(context_chunks, group_size, metadatas)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            notes = list(pool.map(
+                lambda group: self.llm.invoke(self._map_prompt(topic, group)).content,
+                groups,
+            ))
+            while len(notes) > 1 and not self._fits(notes):
+                notes = list(pool.map(
+                    lambda group: self.llm.invoke(self._reduce_prompt(topic, group)).content,
+                    self._note_groups(notes),
+                ))
+        # A single oversized note is the only thing still cut to the budget
+        return self._pack(notes)
+
+    async def _amap_notes(self, topic: str, context_chunks: list[str], group_size: int,
+                          metadatas: list[dict] | None = None) -> str:
+        groups = self._groups(context_chunks, group_size, metadatas)
+        notes = await asyncio.gather(*(
+            self._ainvoke(self._map_prompt(topic, group)) for group in groups
+        ))
+        while len(notes) > 1 and not self._fits(notes):
+            notes = await asyncio.gather(*(
+                self._ainvoke(self._reduce_prompt(topic, group))
+                for group in self._note_groups(notes)
+            ))
+        return self._pack(notes)
+
+    def summarize_section(self, title: str, text: str) -> str:
+        """Summariser for SummaryJobQueue workers.
+
+        Page ranges are usually far over the model's budget, so they are
+        summarised piece by piece and the notes merged in stages.
+        """
+        pieces = split_to_budget(text, self._budget())
+        notes = [self.llm.invoke(self._map_prompt(title, piece)).content for piece in pieces]
+        if len(notes) == 1:
+            return notes[0]
+        while len(notes) > 1 and not self._fits(notes):
+            notes = [
+                self.llm.invoke(self._reduce_prompt(title, group)).content
+                for group in self._note_groups(notes)
+            ]
+        if len(notes) == 1:
+            return notes[0]
+        return self.llm.invoke(self._reduce_prompt(title, "\n\n".join(notes))).content
+
+    def _precomputed_prompt(self, topic: str, style: str, top_k: int) -> str | None:
+        """Cheat sheet prompt built from precomputed section summaries, if any match"""
+        if self.summary_queue is None:
+            return None
+        # Section summaries are much denser than chunks, so fewer are needed
+        summaries = self.summary_queue.relevant_summaries(topic, top_k=max(1, top_k // 2))
+        if not summaries:
+            return None
+        return self._build_prompt(topic, self._pack(summaries), style)
+
+    @staticmethod
+    def _namespace(style: str, top_k: int, map_reduce: bool, group_size: int, use_precomputed: bool) -> str:
+        # Semantic cache namespace; each mode answers differently, as in _cache_key
+        mode = f"map_reduce:{group_size}" if map_reduce else "plain"
+        source = "precomputed" if use_precomputed else "chunks"
+        return f"summary:{style}:{top_k}:{mode}:{source}"
+
+    def _cache_key(self, topic: str, style: str, context_chunks: list[str],
+                   prompt: str, map_reduce: bool, group_size: int) -> str:
+        if not map_reduce:
+            return prompt
+        # Map-reduce reads every chunk, not only those that fit one prompt,
+        # and answers differently, so key it on the full chunk list
+        full_prompt = self._build_prompt(topic, "\n\n".join(context_chunks), style)
+        return f"[map_reduce:{group_size}]\n{full_prompt}"
+
+    def run(
+            self,
+            topic: str,
+            style: str ="cheat_sheet",
+            top_k: int = 8,
+            use_cache: bool = True,
+            map_reduce: bool = False,
+            group_size: int = 4,
+            max_workers: int = 4,
+            use_precomputed: bool = True,
+    ) -> str:
+        """With map_reduce, chunk groups are summarised in parallel and then merged.
+
+        When section summaries were precomputed at ingest time, the matching
+        ones are merged instead of summarising raw chunks.
+        """
+        namespace = self._namespace(style, top_k, map_reduce, group_size, use_precomputed)
+        cached = self._semantic_get(namespace, topic, use_cache)
+        if cached is not None:
+            return cached
+
+        # Matching precomputed section summaries replace chunk retrieval
+        prompt = self._precomputed_prompt(topic, style, top_k) if use_precomputed else None
+        precomputed = prompt is not None
+        if precomputed:
+            key = prompt
+        else:
+            context_chunks, metadatas = self._retrieve_documents(topic, top_k)
+            context = self._pack(context_chunks, metadatas)
+            prompt = self._build_prompt(topic, context, style)
+            key = self._cache_key(topic, style, context_chunks, prompt, map_reduce, group_size)
+
+        cached = self._cache_get(key, use_cache)
+        if cached is not None:
+            return cached
+        if map_reduce and not precomputed:
+            notes = self._map_notes(topic, context_chunks, group_size, max_workers, metadatas)
+            prompt = self._build_prompt(topic, notes, style)
+        response = self.llm.invoke(prompt).content
+        self._cache_put(key, response, use_cache)
+        self._semantic_put(namespace, topic, response, use_cache)
+        return response
+
+    async def _aprecomputed_prompt(self, topic: str, style: str, top_k: int) -> str | None:
+        # Reads SQLite and builds a BM25 index, so keep it off the loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._precomputed_prompt, topic, style, top_k)
+        )
+
+    async def arun(
+            self,
+            topic: str,
+            style: str ="cheat_sheet",
+            top_k: int = 8,
+            use_cache: bool = True,
+            map_reduce: bool = False,
+            group_size: int = 4,
+            use_precomputed: bool = True,
+    ) -> str:
+        namespace = self._namespace(style, top_k, map_reduce, group_size, use_precomputed)
+        cached = await self._asemantic_get(namespace, topic, use_cache)
+        if cached is not None:
+            return cached
+
+        # Matching precomputed section summaries replace chunk retrieval
+        prompt = await self._aprecomputed_prompt(topic, style, top_k) if use_precomputed else None
+        precomputed = prompt is not None
+        if precomputed:
+            key = prompt
+        else:
+            context_chunks, metadatas = await self._aretrieve_documents(topic, top_k)
+            context = self._pack(context_chunks, metadatas)
+            prompt = self._build_prompt(topic, context, style)
+            key = self._cache_key(topic, style, context_chunks, prompt, map_reduce, group_size)
+
+        cached = self._cache_get(key, use_cache)
+        if cached is not None:
+            return cached
+        if map_reduce and not precomputed:
+            notes = await self._amap_notes(topic, context_chunks, group_size, metadatas)
+            prompt = self._build_prompt(topic, notes, style)
+        response = await self._ainvoke(prompt)
+        self._cache_put(key, response, use_cache)
+        await self._asemantic_put(namespace, topic, response, use_cache)
+        return response
+
+    def stream(
+            self,
+            topic: str,
+            style: str ="cheat_sheet",
+            top_k: int = 8,
+            use_cache: bool = True,
+            map_reduce: bool = False,
+            group_size: int = 4,
+            max_workers: int = 4,
+            use_precomputed: bool = True,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> Iterator[str]:
+        """Yield the cheat sheet token by token; with map_reduce only the merge streams"""
+        namespace = self._namespace(style, top_k, map_reduce, group_size, use_precomputed)
+        cached = self._semantic_get(namespace, topic, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        # Matching precomputed section summaries replace chunk retrieval
+        prompt = self._precomputed_prompt(topic, style, top_k) if use_precomputed else None
+        precomputed = prompt is not None
+        if precomputed:
+            key = prompt
+        else:
+            context_chunks, metadatas = self._retrieve_documents(topic, top_k)
+            context = self._pack(context_chunks, metadatas)
+            prompt = self._build_prompt(topic, context, style)
+            key = self._cache_key(topic, style, context_chunks, prompt, map_reduce, group_size)
+
+        cached = self._cache_get(key, use_cache)
+        if cached is not None:
+            yield cached
+            return
+        if map_reduce and not precomputed:
+            notes = self._map_notes(topic, context_chunks, group_size, max_workers, metadatas)
+            prompt = self._build_prompt(topic, notes, style)
+        tokens = []
+        for token in self._stream(prompt, on_timings):
+            tokens.append(token)
+            yield token
+        response = "".join(tokens)
+        self._cache_put(key, response, use_cache)
+        self._semantic_put(namespace, topic, response, use_cache)
+
+    async def astream(
+            self,
+            topic: str,
+            style: str ="cheat_sheet",
+            top_k: int = 8,
+            use_cache: bool = True,
+            map_reduce: bool = False,
+            group_size: int = 4,
+            use_precomputed: bool = True,
+            on_timings: Callable[[StreamTimings], None] | None = None,
+    ) -> AsyncIterator[str]:
+        namespace = self._namespace(style, top_k, map_reduce, group_size, use_precomputed)
+        cached = await self._asemantic_get(namespace, topic, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        # Matching precomputed section summaries replace chunk retrieval
+        prompt = await self._aprecomputed_prompt(topic, style, top_k) if use_precomputed else None
+        precomputed = prompt is not None
+        if precomputed:
+            key = prompt
+        else:
+            context_chunks, metadatas = await self._aretrieve_documents(topic, top_k)
+            context = self._pack(context_chunks, metadatas)
+            prompt = self._build_prompt(topic, context, style)
+            key = self._cache_key(topic, style, context_chunks, prompt, map_reduce, group_size)
+
+        cached = self._cache_get(key, use_cache)
+        if cached is not None:
+            yield cached
+            return
+        if map_reduce and not precomputed:
+            notes = await self._amap_notes(topic, context_chunks, group_size, metadatas)
+            prompt = self._build_prompt(topic, notes, style)
+        tokens = []
+        async for token in self._astream(prompt, on_timings):
+            tokens.append(token)
+            yield token
+        response = "".join(tokens)
+        self._cache_put(key, response, use_cache)
+        await self._asemantic_put(namespace, topic, response, use_cache)
@@ -3,4 +3,21 @@ from abc import ABC, abstractmethod
 class BaseRetriever(ABC):
     @abstractmethod
     def retrieve(self, query: str, top_match: int=2)-> list[str]:
-        pass
\ No newline at end of file
+        pass
+
+    def retrieve_documents(self, query: str, top_k: int = 2) -> list[tuple[str, dict]]:
+        """Return (text, metadata) pairs; backends without metadata return {}"""
+        return [(text, {}) for text in self.retrieve(query, top_k=top_k)]
+
+    @abstractmethod
+    def retrieve_with_scores(self, query: str, top_k: int = 2) -> list[tuple[str, float]]:
+        """Return (text, score) pairs, best first; higher scores are closer on every backend"""
+        pass
+
+    def retrieve_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, float]]]:
+        """Return (text, score) results per query; backends override this to batch"""
+        return [self.retrieve_with_scores(q, top_k=top_k) for q in queries]
+
+    def retrieve_documents_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, dict]]]:
+        """Return (text, metadata) results per query; backends override this to batch"""
+        return [self.retrieve_documents(q, top_k=top_k) for q in queries]
@@ -0,0 +1,56 @@
+"""Compare query latency of the Chroma and NumPy retriever backends.
+
+Usage: python -m retrieval.benchmark <subject_id> [repeats]
+"""
+import statistics
+import sys
+import time
+
+QUERIES = [
+    "Open Shortest Path First",
+    "Intra-AS Routing in the Internet",
+    "CSMA/CD collision detection",
+    "cyclic redundancy check",
+    "link state routing algorithm",
+]
+
+
+def time_retriever(retriever, queries: list[str], repeats: int, top_k: int = 3) -> dict:
+    # Warm up once so lazy loading is not counted as query latency
+    retriever.retrieve(queries[0], top_k=top_k)
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            retriever.retrieve(query, top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+def main(subject_id: str, repeats: int = 20):
+    from embedding.cached_embedder import CachedEmbedder
+    from embedding.local_embedder import LocalEmbedder
+    from subjects.subject_manager import SubjectManager
+
+    manager = SubjectManager(CachedEmbedder(LocalEmbedder(show_progress_bar=False)))
+
+    for backend in ("chroma", "numpy"):
+        start = time.perf_counter()
+        retriever = manager.get_retriever(subject_id, backend=backend)
+        retriever.retrieve(QUERIES[0])
+        load = (time.perf_counter() - start) * 1000
+        result = time_retriever(retriever, QUERIES, repeats)
+        print(
+            f"{backend:>6}: load {load:8.1f} ms | "
+            f"mean {result['mean_ms']:.2f} ms | p50 {result['p50_ms']:.2f} ms | "
+            f"p95 {result['p95_ms']:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 20)
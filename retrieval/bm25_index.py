@@ -0,0 +1,108 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+BM25_FILE = "bm25.json"
+
+# Keeps acronyms such as "CSMA/CD" or "IEEE-802.11" together as one token
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[/\-.][a-z0-9]+)*")
+
+
+# Function words that match almost any English text
+STOPWORDS = frozenset("""
+a about an and are as at be but by can do does for from how i in is it its
+me of on or so that the their there these this to was what when where which
+who why will with you your explain describe tell give summary summarize
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        tokens.append(token)
+        # Also index the parts so "CSMA" matches "CSMA/CD"
+        parts = re.split(r"[/\-.]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+class BM25Index:
+    """Sparse inverted index over a subject's chunks, persisted as bm25.json"""
+
+    def __init__(self, path: str | None, k1: float = 1.5, b: float = 0.75):
+        # path=None keeps the index in memory only
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.docs: dict[str, str] = {}
+        self.lengths: dict[str, int] = {}
+        self.postings: dict[str, dict[str, int]] = {}
+
+        file_path = os.path.join(path, BM25_FILE) if path else None
+        if file_path and os.path.exists(file_path):
+            with open(file_path, "r") as f:
+                data = json.load(f)
+            self.docs = data["docs"]
+            self.lengths = data["lengths"]
+            self.postings = data["postings"]
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, BM25_FILE))
+
+    def add(self, ids: list[str], texts: list[str]):
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self.docs:
+                self.remove([doc_id])
+            tokens = tokenize(text)
+            self.docs[doc_id] = text
+            self.lengths[doc_id] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, ids: list[str]):
+        for doc_id in ids:
+            text = self.docs.pop(doc_id, None)
+            if text is None:
+                continue
+            self.lengths.pop(doc_id, None)
+            for term in set(tokenize(text)):
+                posting = self.postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self.postings[term]
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        file_path = os.path.join(self.path, BM25_FILE)
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"docs": self.docs, "lengths": self.lengths, "postings": self.postings},
+                f,
+            )
+        os.replace(tmp_path, file_path)
+
+    def search(self, query: str, top_k: int = 10) -> list[tuple[str, str, float]]:
+        """Return (id, text, score) for the best matching chunks"""
+        n = len(self.docs)
+        if n == 0:
+            return []
+        avg_len = sum(self.lengths.values()) / n
+
+        scores: dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = 1 - self.b + self.b * self.lengths[doc_id] / avg_len
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(doc_id, self.docs[doc_id], score) for doc_id, score in best]
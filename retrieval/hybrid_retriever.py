@@ -0,0 +1,94 @@
+from ingestion.chunk_ids import chunk_metadata
+
+from .base_retriever import BaseRetriever
+from .bm25_index import BM25Index
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse dense and BM25 rankings with reciprocal rank fusion.
+
+    Exact terms such as "OSPF" or "CRC" are found by BM25 even when the
+    dense ranking misses them, so a small top_k is enough.
+    """
+
+    def __init__(self, dense: BaseRetriever, sparse: BM25Index, rrf_k: int = 60, candidates: int = 4):
+        self.dense = dense
+        self.sparse = sparse
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self._ids_by_text = None
+
+    def _chunk_id(self, text: str) -> str:
+        # Dense backends that return no metadata are matched through BM25's texts
+        if self._ids_by_text is None:
+            self._ids_by_text = {text: doc_id for doc_id, text in self.sparse.docs.items()}
+        return self._ids_by_text.get(text, text)
+
+    def _dense_ranking(self, documents: list[tuple[str, dict]]) -> list[tuple[str, str, dict]]:
+        return [
+            ((metadata or {}).get("chunk_id") or self._chunk_id(text), text, metadata or {})
+            for text, metadata in documents
+        ]
+
+    def _sparse_ranking(self, query: str, top_k: int) -> list[tuple[str, str, dict]]:
+        return [
+            (chunk_id, text, chunk_metadata(chunk_id))
+            for chunk_id, text, _ in self.sparse.search(query, top_k=top_k)
+        ]
+
+    def _fuse(self, dense: list, sparse: list, top_k: int) -> list[tuple[str, dict, float]]:
+        # Chunks are matched on their id; the dense metadata wins when both have one
+        scores: dict[str, float] = {}
+        documents: dict[str, tuple[str, dict]] = {}
+        for ranking in (dense, sparse):
+            for rank, (chunk_id, text, metadata) in enumerate(ranking, 1):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (self.rrf_k + rank)
+                documents.setdefault(chunk_id, (text, metadata))
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(*documents[chunk_id], score) for chunk_id, score in best]
+
+    def _search(self, query: str, top_k: int) -> list[tuple[str, dict, float]]:
+        pool = top_k * self.candidates
+        return self._fuse(
+            self._dense_ranking(self.dense.retrieve_documents(query, top_k=pool)),
+            self._sparse_ranking(query, pool),
+            top_k,
+        )
+
+    def retrieve_documents(self, query: str, top_k: int = 2) -> list[tuple[str, dict]]:
+        return [(text, metadata) for text, metadata, _ in self._search(query, top_k)]
+
+    def retrieve_with_scores(self, query: str, top_k: int = 2) -> list[tuple[str, float]]:
+        return [(text, score) for text, _, score in self._search(query, top_k)]
+
+    def retrieve_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, float]]]:
+        pool = top_k * self.candidates
+        dense_results = self.dense.retrieve_many(queries, top_k=pool)
+        return [
+            [
+                (text, score)
+                for text, _, score in self._fuse(
+                    self._dense_ranking([(text, {}) for text, _ in dense]),
+                    self._sparse_ranking(query, pool),
+                    top_k,
+                )
+            ]
+            for query, dense in zip(queries, dense_results)
+        ]
+
+    def retrieve_documents_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, dict]]]:
+        pool = top_k * self.candidates
+        dense_results = self.dense.retrieve_documents_many(queries, top_k=pool)
+        return [
+            [
+                (text, metadata)
+                for text, metadata, _ in self._fuse(
+                    self._dense_ranking(dense), self._sparse_ranking(query, pool), top_k
+                )
+            ]
+            for query, dense in zip(queries, dense_results)
+        ]
+
+    def retrieve(self, query: str, top_k: int = 2) -> list[str]:
+        return [text for text, _ in self.retrieve_with_scores(query, top_k)]
@@ -0,0 +1,129 @@
+import json
+import os
+import numpy as np
+from .base_retriever import BaseRetriever
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+
+
+def _matches(metadata: dict, where: dict) -> bool:
+    for key, condition in where.items():
+        value = (metadata or {}).get(key)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class NumpyRetriever(BaseRetriever):
+    """Brute-force cosine search over a memory-mapped float32 matrix.
+
+    The index lives next to the subject's Chroma store as vectors.npy (rows
+    L2-normalised) and chunks.json (ids, texts, metadata). The matrix is
+    opened with mmap_mode="r", so loading is near instant and worker
+    processes share the same page cache.
+
+    where restricts results to chunks whose metadata matches, using the
+    equality and "$in" subset of Chroma's filter syntax.
+    """
+
+    def __init__(self, path: str, embedder, where: dict | None = None):
+        self.path = path
+        self.embedder = embedder
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        with open(os.path.join(path, CHUNKS_FILE), "r") as f:
+            chunks = json.load(f)
+        self.ids = chunks["ids"]
+        self.texts = chunks["texts"]
+        self.metadatas = chunks["metadatas"]
+
+        self.where = where
+        self._mask = None
+        if where:
+            self._mask = np.array([_matches(m, where) for m in self.metadatas], dtype=bool)
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, VECTORS_FILE))
+
+    @staticmethod
+    def build(path: str, ids: list[str], texts: list[str], embeddings, metadatas: list[dict],
+              dim: int | None = None):
+        """Write (or overwrite) the index files for one subject; dim is the
+        embedding width, needed to size the matrix when there are no chunks"""
+        if texts:
+            vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+        elif dim is not None:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        else:
+            raise ValueError("dim is required to build an index without chunks")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = np.ascontiguousarray(vectors / norms)
+
+        os.makedirs(path, exist_ok=True)
+        # Write to temp files first so readers never see a half-written index
+        tmp_vectors = os.path.join(path, VECTORS_FILE + ".tmp")
+        tmp_chunks = os.path.join(path, CHUNKS_FILE + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, vectors)
+        with open(tmp_chunks, "w") as f:
+            json.dump({"ids": ids, "texts": texts, "metadatas": metadatas}, f)
+        os.replace(tmp_vectors, os.path.join(path, VECTORS_FILE))
+        os.replace(tmp_chunks, os.path.join(path, CHUNKS_FILE))
+
+    def _normalise(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        k = min(top_k, scores.shape[0])
+        if self._mask is not None:
+            scores = np.where(self._mask, scores, -np.inf)
+            k = min(k, int(self._mask.sum()))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        best = np.argpartition(-scores, k - 1)[:k]
+        return best[np.argsort(-scores[best])]
+
+    def retrieve_with_scores(self, query: str, top_k: int = 2) -> list[tuple[str, float]]:
+        query_vector = self._normalise(self.embedder.embed_query(query))
+        scores = self.vectors @ query_vector
+        return [(self.texts[i], float(scores[i])) for i in self._top_k(scores, top_k)]
+
+    def _scores_many(self, queries: list[str]) -> np.ndarray:
+        """Score every query against the matrix with one matrix product"""
+        query_vectors = self._normalise(self.embedder.embed_queries(queries))
+        return query_vectors @ self.vectors.T
+
+    def retrieve_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, float]]]:
+        if not queries:
+            return []
+        scores = self._scores_many(queries)
+        return [
+            [(self.texts[i], float(row[i])) for i in self._top_k(row, top_k)]
+            for row in scores
+        ]
+
+    def retrieve_documents_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, dict]]]:
+        if not queries:
+            return []
+        return [
+            [(self.texts[i], self.metadatas[i]) for i in self._top_k(row, top_k)]
+            for row in self._scores_many(queries)
+        ]
+
+    def retrieve_documents(self, query: str, top_k: int = 2) -> list[tuple[str, dict]]:
+        query_vector = self._normalise(self.embedder.embed_query(query))
+        scores = self.vectors @ query_vector
+        return [(self.texts[i], self.metadatas[i]) for i in self._top_k(scores, top_k)]
+
+    def retrieve(self, query: str, top_k: int = 2) -> list[str]:
+        return [text for text, _ in self.retrieve_with_scores(query, top_k)]
@@ -1,10 +1,73 @@
-from langchain_community.vectorstores import Chroma
+from typing import TYPE_CHECKING, Callable, Union
 from .base_retriever import BaseRetriever
 
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+
 class VectorRetriever(BaseRetriever):
-    def __init__(self, vectorstore: Chroma):
-        self.vectorstore = vectorstore
+    def __init__(self, vectorstore: Union["Chroma", Callable[[], "Chroma"]], where: dict | None = None):
+        # where is a Chroma metadata filter, e.g. {"source": "Chapter_05.pdf"}
+        self.where = where
+        # A zero-argument factory defers opening the store to the first query
+        if callable(vectorstore):
+            self._factory = vectorstore
+            self._vectorstore = None
+        else:
+            self._factory = None
+            self._vectorstore = vectorstore
+
+    @property
+    def vectorstore(self) -> "Chroma":
+        if self._vectorstore is None:
+            self._vectorstore = self._factory()
+        return self._vectorstore
 
     def retrieve(self, query: str, top_k: int = 2) -> list[str]:
-        results = self.vectorstore.similarity_search(query, k=top_k)
-        return [r.page_content for r in results]
\ No newline at end of file
+        results = self.vectorstore.similarity_search(query, k=top_k, filter=self.where)
+        return [r.page_content for r in results]
+
+    def retrieve_documents(self, query: str, top_k: int = 2) -> list[tuple[str, dict]]:
+        results = self.vectorstore.similarity_search(query, k=top_k, filter=self.where)
+        return [(r.page_content, r.metadata or {}) for r in results]
+
+    def retrieve_with_scores(self, query: str, top_k: int = 2) -> list[tuple[str, float]]:
+        """Chroma distances turned into relevance scores, so higher is closer"""
+        results = self.vectorstore.similarity_search_with_relevance_scores(
+            query, k=top_k, filter=self.where
+        )
+        return [(doc.page_content, float(score)) for doc, score in results]
+
+    def _query_many(self, queries: list[str], top_k: int, include: list[str]) -> dict:
+        """Embed every query in one batch and run a single collection query"""
+        embeddings = self.vectorstore.embeddings
+        if hasattr(embeddings, "embed_queries"):
+            vectors = embeddings.embed_queries(queries)
+        else:
+            vectors = [embeddings.embed_query(q) for q in queries]
+
+        return self.vectorstore._collection.query(
+            query_embeddings=vectors,
+            n_results=top_k,
+            where=self.where,
+            include=include,
+        )
+
+    def retrieve_documents_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, dict]]]:
+        if not queries:
+            return []
+        results = self._query_many(queries, top_k, ["documents", "metadatas"])
+        return [
+            [(text, metadata or {}) for text, metadata in zip(texts, metadatas)]
+            for texts, metadatas in zip(results["documents"], results["metadatas"])
+        ]
+
+    def retrieve_many(self, queries: list[str], top_k: int = 2) -> list[list[tuple[str, float]]]:
+        if not queries:
+            return []
+        results = self._query_many(queries, top_k, ["documents", "distances"])
+        # The same distance-to-relevance mapping retrieve_with_scores uses
+        relevance = self.vectorstore._select_relevance_score_fn()
+        return [
+            [(text, float(relevance(distance))) for text, distance in zip(texts, distances)]
+            for texts, distances in zip(results["documents"], results["distances"])
+        ]
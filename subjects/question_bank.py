@@ -0,0 +1,151 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import numpy as np
+
+QUESTION_BANK_FILE = "question_bank.sqlite3"
+
+
+def _prompt_key(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+class QuestionBank:
+    """Validated quiz questions of one subject, stored for reuse.
+
+    Questions are indexed by quiz_type, difficulty and the chunk ids they
+    were generated from, and carry the embedding of their topic so a quiz
+    for a similar topic can be assembled without calling the LLM.
+    """
+
+    def __init__(self, path: str, embedder, threshold: float = 0.8):
+        self.path = path
+        self.embedder = embedder
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, QUESTION_BANK_FILE), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS questions (
+                   id INTEGER PRIMARY KEY,
+                   topic TEXT NOT NULL,
+                   quiz_type TEXT NOT NULL,
+                   difficulty TEXT NOT NULL,
+                   prompt_key TEXT NOT NULL,
+                   question TEXT NOT NULL,
+                   topic_vector BLOB NOT NULL,
+                   times_served INTEGER NOT NULL DEFAULT 0,
+                   created REAL NOT NULL,
+                   UNIQUE (quiz_type, prompt_key)
+               );
+               CREATE INDEX IF NOT EXISTS idx_questions_type_difficulty
+                   ON questions (quiz_type, difficulty);
+               CREATE TABLE IF NOT EXISTS question_chunks (
+                   question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+                   chunk_id TEXT NOT NULL
+               );
+               CREATE INDEX IF NOT EXISTS idx_question_chunks_chunk
+                   ON question_chunks (chunk_id);"""
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, QUESTION_BANK_FILE))
+
+    def _embed(self, topic: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.embed_query(topic), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add_quiz(self, topic: str, quiz: dict, quiz_type: str, difficulty: str) -> int:
+        """Store the questions of a validated quiz; returns how many were new"""
+        vector = self._embed(topic).tobytes()
+        chunk_ids = quiz.get("source_chunks", [])
+        added = 0
+        now = time.time()
+        with self._lock:
+            for q in quiz["questions"]:
+                question = {k: v for k, v in q.items() if k != "id"}
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO questions "
+                    "(topic, quiz_type, difficulty, prompt_key, question, topic_vector, created) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        topic, quiz_type, difficulty,
+                        _prompt_key(q["prompt"]),
+                        json.dumps(question), vector, now,
+                    ),
+                )
+                if cursor.rowcount:
+                    added += 1
+                    self._conn.executemany(
+                        "INSERT INTO question_chunks (question_id, chunk_id) VALUES (?, ?)",
+                        [(cursor.lastrowid, chunk_id) for chunk_id in chunk_ids],
+                    )
+            self._conn.commit()
+        return added
+
+    def sample(self, topic: str, quiz_type: str, difficulty: str, count: int) -> list[dict]:
+        """Up to count stored questions for a similar topic, least served first"""
+        query = self._embed(topic)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, question, topic_vector, times_served FROM questions "
+                "WHERE quiz_type = ? AND difficulty = ?",
+                (quiz_type, difficulty),
+            ).fetchall()
+        if not rows:
+            return []
+
+        vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        scores = vectors @ query
+        matches = [(rows[i], float(scores[i])) for i in np.flatnonzero(scores >= self.threshold)]
+        # Rotate through the bank rather than always serving the same questions
+        random.shuffle(matches)
+        matches.sort(key=lambda m: m[0][3])
+        return [json.loads(row[1]) for row, _ in matches[:count]]
+
+    def mark_served(self, questions: list[dict], quiz_type: str):
+        """Count questions from sample() as served, once their quiz was returned"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE questions SET times_served = times_served + 1 "
+                "WHERE quiz_type = ? AND prompt_key = ?",
+                [(quiz_type, _prompt_key(q["prompt"])) for q in questions],
+            )
+            self._conn.commit()
+
+    def delete_by_chunks(self, chunk_ids: list[str]) -> int:
+        """Drop questions generated from chunks that were re-ingested or removed"""
+        if not chunk_ids:
+            return 0
+        deleted = 0
+        with self._lock:
+            for start in range(0, len(chunk_ids), 500):
+                batch = chunk_ids[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                cursor = self._conn.execute(
+                    f"DELETE FROM questions WHERE id IN ("
+                    f"SELECT question_id FROM question_chunks WHERE chunk_id IN ({placeholders}))",
+                    batch,
+                )
+                deleted += cursor.rowcount
+            self._conn.commit()
+        return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT quiz_type, difficulty, COUNT(*) FROM questions GROUP BY quiz_type, difficulty"
+            ).fetchall()
+        return {f"{quiz_type}/{difficulty}": count for quiz_type, difficulty, count in rows}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,254 @@
+"""Bulk quiz generation over a subject, resumable from a checkpoint file.
+
+Usage:
+    python -m subjects.quiz_jobs <subject_id> [--topics "A" "B" ...]
+        [--quiz-types mcq true_false] [--num-questions 5] [--concurrency 2]
+    python -m subjects.quiz_jobs --all [...]
+
+With --all every subject is run in turn, each with its own checkpoint.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+
+CHECKPOINT_FILE = "quiz_jobs.jsonl"
+
+# Numbered textbook headings such as "5.3 Intra-AS Routing in the Internet: OSPF"
+_HEADING_RE = re.compile(r"^\s*(\d+\.\d+(?:\.\d+)?)\s+([A-Z][^\n]{3,80}?)\s*$", re.MULTILINE)
+
+
+def derive_topics(manager, subject_id: str, limit: int | None = None) -> list[str]:
+    """Collect section headings from a subject's ingested chunks"""
+    documents = manager._open_vectorstore(subject_id).get(include=["documents"])["documents"]
+
+    topics = {}
+    for text in documents:
+        for number, title in _HEADING_RE.findall(text):
+            topics.setdefault(number, title.rstrip(" .:"))
+
+    def section_key(number):
+        return tuple(int(part) for part in number.split("."))
+
+    ordered = [topics[n] for n in sorted(topics, key=section_key)]
+    # Headings repeat in page headers; keep the first occurrence of each title
+    unique = list(dict.fromkeys(ordered))
+    return unique[:limit] if limit else unique
+
+
+class QuizJobRunner:
+    """Generate quizzes for many topics with bounded LLM concurrency.
+
+    Every finished job is appended to a JSONL checkpoint (by default
+    db/<subject>/quiz_jobs.jsonl); jobs already done there are skipped when
+    the runner is started again, so an interrupted run resumes.
+    """
+
+    def __init__(
+            self,
+            manager,
+            subject_id: str,
+            checkpoint_path: str | None = None,
+            model: str = "llama3.2:3b",
+            llm_concurrency: int = 2,
+            max_attempts: int = 2,
+            retriever_backend: str = "chroma",
+            response_cache=None,
+    ):
+        from llm_chains.base_chain import BaseChain
+        from llm_chains.quiz_chain import QuizChain
+
+        self.subject_id = subject_id
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            manager.subject_path(subject_id), CHECKPOINT_FILE
+        )
+        self.max_attempts = max_attempts
+        self.retriever = manager.get_retriever(subject_id, backend=retriever_backend)
+        self.chain = QuizChain(
+            self.retriever,
+            model=model,
+            response_cache=response_cache,
+            question_bank=manager.question_bank(subject_id),
+        )
+        BaseChain.set_concurrency_limit(model, llm_concurrency)
+
+    @staticmethod
+    def _job_key(topic: str, quiz_type: str, difficulty: str, num_questions: int) -> str:
+        return f"{topic}|{quiz_type}|{difficulty}|{num_questions}"
+
+    def completed(self) -> dict[str, dict]:
+        """Finished jobs from the checkpoint, keyed by job"""
+        done = {}
+        if not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash
+                    continue
+                if record.get("status") == "done":
+                    done[record["key"]] = record
+        return done
+
+    def _checkpoint(self, record: dict):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        with open(self.checkpoint_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    async def _run_job(self, topic, quiz_type, difficulty, num_questions, top_k, documents, stats) -> dict:
+        key = self._job_key(topic, quiz_type, difficulty, num_questions)
+        start = time.perf_counter()
+        error = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                stats["retries"] += 1
+            try:
+                quiz = await self.chain.arun(
+                    topic,
+                    num_questions=num_questions,
+                    quiz_type=quiz_type,
+                    difficulty=difficulty,
+                    top_k=top_k,
+                    # Bulk jobs add new questions instead of re-serving banked ones
+                    use_bank=False,
+                    documents=documents,
+                )
+                record = {
+                    "key": key, "topic": topic, "quiz_type": quiz_type,
+                    "difficulty": difficulty, "status": "done", "attempts": attempt,
+                    "seconds": round(time.perf_counter() - start, 2), "quiz": quiz,
+                }
+                stats["done"] += 1
+                self._checkpoint(record)
+                return record
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+        record = {
+            "key": key, "topic": topic, "quiz_type": quiz_type,
+            "difficulty": difficulty, "status": "failed", "attempts": self.max_attempts,
+            "seconds": round(time.perf_counter() - start, 2), "error": error,
+        }
+        stats["failed"] += 1
+        self._checkpoint(record)
+        return record
+
+    async def arun(
+            self,
+            topics: list[str],
+            quiz_types: tuple[str, ...] = ("mcq",),
+            difficulty: str = "intermediate",
+            num_questions: int = 5,
+            top_k: int = 3,
+    ) -> dict:
+        completed = self.completed()
+        jobs = [
+            (topic, quiz_type)
+            for topic in topics
+            for quiz_type in quiz_types
+            if self._job_key(topic, quiz_type, difficulty, num_questions) not in completed
+        ]
+        stats = {"done": 0, "failed": 0, "retries": 0}
+        print(f"{len(jobs)} job(s) to run, {len(completed)} already done")
+
+        start = time.perf_counter()
+        # Every quiz type of a topic shares its context: retrieve each topic
+        # once, with all query embeddings in one batch
+        topics_to_run = list(dict.fromkeys(topic for topic, _ in jobs))
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None, self.retriever.retrieve_documents_many, topics_to_run, top_k
+        )
+        documents = {
+            topic: ([text for text, _ in found], [metadata for _, metadata in found])
+            for topic, found in zip(topics_to_run, results)
+        }
+
+        # Jobs all start at once; BaseChain's per-model semaphore bounds the LLM calls
+        await asyncio.gather(*(
+            self._run_job(topic, quiz_type, difficulty, num_questions, top_k, documents[topic], stats)
+            for topic, quiz_type in jobs
+        ))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "subject_id": self.subject_id,
+            "jobs": len(jobs),
+            "skipped": len(completed),
+            "done": stats["done"],
+            "failed": stats["failed"],
+            "retries": stats["retries"],
+            "json_repairs": dict(self.chain.repair_stats),
+            "elapsed_seconds": round(elapsed, 2),
+            "quizzes_per_minute": round(stats["done"] / elapsed * 60, 2) if elapsed else 0.0,
+            "checkpoint": self.checkpoint_path,
+        }
+
+    def run(self, *args, **kwargs) -> dict:
+        return asyncio.run(self.arun(*args, **kwargs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate quizzes for a subject")
+    parser.add_argument("subject_id", nargs="?")
+    parser.add_argument("--all", action="store_true", help="run every subject in turn")
+    parser.add_argument("--topics", nargs="*", help="defaults to the section headings of the subject")
+    parser.add_argument("--max-topics", type=int, default=None)
+    parser.add_argument("--quiz-types", nargs="+", default=["mcq"],
+                        choices=["mcq", "true_false", "short_answer"])
+    parser.add_argument("--difficulty", default="intermediate")
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--model", default="llama3.2:3b")
+    parser.add_argument("--concurrency", type=int, default=2, help="LLM requests in flight")
+    parser.add_argument("--checkpoint", default=None, help="single subject only")
+    args = parser.parse_args(argv)
+    if bool(args.subject_id) == args.all:
+        parser.error("give either a subject_id or --all")
+    if args.all and args.checkpoint:
+        parser.error("--checkpoint needs a single subject; --all uses one per subject")
+
+    from embedding.cached_embedder import CachedEmbedder
+    from embedding.local_embedder import LocalEmbedder
+    from subjects.subject_manager import SubjectManager
+
+    manager = SubjectManager(CachedEmbedder(LocalEmbedder(show_progress_bar=False)))
+    if args.all:
+        subject_ids = list(manager.list_subjects())
+    elif manager.subject_exist(args.subject_id):
+        subject_ids = [args.subject_id]
+    else:
+        parser.error(f"Unknown subject: {args.subject_id}")
+
+    reports = {}
+    for subject_id in subject_ids:
+        topics = args.topics or derive_topics(manager, subject_id, args.max_topics)
+        if not topics:
+            print(f"No topics found for {subject_id}, skipping")
+            continue
+        # Each subject resumes from its own db/<subject>/quiz_jobs.jsonl
+        runner = QuizJobRunner(
+            manager,
+            subject_id,
+            checkpoint_path=args.checkpoint,
+            model=args.model,
+            llm_concurrency=args.concurrency,
+        )
+        reports[subject_id] = runner.run(
+            topics,
+            quiz_types=tuple(args.quiz_types),
+            difficulty=args.difficulty,
+            num_questions=args.num_questions,
+            top_k=args.top_k,
+        )
+    print(json.dumps(reports if args.all else reports.get(args.subject_id), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+import os
+import json
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+CATALOG_FILE = "./db/catalog.sqlite3"
+LEGACY_METADATA_FILE = "metadata.json"
+LEASE_TTL_SECONDS = 60.0
+
+
+class SubjectCatalog:
+    """Subjects, their files, page hashes and ingest status in SQLite.
+
+    The database runs in WAL mode, so readers never block and writers in
+    other processes wait on the lock instead of overwriting each other.
+    Every change is one short BEGIN IMMEDIATE transaction. Work that spans
+    many transactions, such as an ingest, holds a per-subject lease: a row
+    naming its owner that the holder keeps renewing and that expires if
+    the holder dies. On first open,
+    an existing metadata.json is imported once; the JSON file is left in
+    place but no longer read.
+    """
+
+    def __init__(self, path: str = CATALOG_FILE, legacy_path: str = LEGACY_METADATA_FILE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        # isolation_level=None: transactions are opened explicitly below
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS subjects (
+                       subject_id TEXT PRIMARY KEY,
+                       name TEXT NOT NULL,
+                       path TEXT NOT NULL,
+                       status TEXT NOT NULL DEFAULT 'empty',
+                       error TEXT,
+                       updated REAL NOT NULL
+                   )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS files (
+                       subject_id TEXT NOT NULL REFERENCES subjects ON DELETE CASCADE,
+                       file_name TEXT NOT NULL,
+                       sha256 TEXT,
+                       alias_of TEXT,
+                       chunk_count INTEGER NOT NULL DEFAULT 0,
+                       source_path TEXT,
+                       updated REAL NOT NULL,
+                       PRIMARY KEY (subject_id, file_name)
+                   )"""
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(files)")]
+            if "source_path" not in columns:
+                conn.execute("ALTER TABLE files ADD COLUMN source_path TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files (subject_id, sha256)"
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                       subject_id TEXT NOT NULL,
+                       file_name TEXT NOT NULL,
+                       page TEXT NOT NULL,
+                       hash TEXT NOT NULL,
+                       chunk_ids TEXT NOT NULL,
+                       PRIMARY KEY (subject_id, file_name, page),
+                       FOREIGN KEY (subject_id, file_name)
+                           REFERENCES files ON DELETE CASCADE
+                   )"""
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS leases (
+                       subject_id TEXT PRIMARY KEY,
+                       owner TEXT NOT NULL,
+                       expires REAL NOT NULL
+                   )"""
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._migrate_json(conn, legacy_path)
+
+    @contextmanager
+    def _transaction(self, mode: str = "IMMEDIATE"):
+        # DEFERRED for multi-query reads: one consistent WAL snapshot
+        with self._lock:
+            self._conn.execute(f"BEGIN {mode}")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _migrate_json(self, conn, legacy_path: str):
+        done = conn.execute(
+            "SELECT 1 FROM catalog_info WHERE key = 'migrated_json'"
+        ).fetchone()
+        if done or not os.path.exists(legacy_path):
+            return
+
+        with open(legacy_path, "r") as f:
+            legacy = json.load(f).get("subjects", {})
+
+        now = time.time()
+        for subject_id, subject in legacy.items():
+            conn.execute(
+                "INSERT OR IGNORE INTO subjects (subject_id, name, path, status, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (subject_id, subject["name"], subject["path"],
+                 "ready" if subject.get("files") else "empty", now),
+            )
+            hashes = subject.get("hashes", {})
+            # Files ingested before hashes were tracked get a NULL hash;
+            # ingest_files drops their old chunks and ingests them again
+            for file_name in set(subject.get("files", [])) | set(hashes):
+                self._write_file(conn, subject_id, file_name, hashes.get(file_name), now)
+
+        conn.execute(
+            "INSERT INTO catalog_info (key, value) VALUES ('migrated_json', ?)",
+            (os.path.abspath(legacy_path),),
+        )
+        print(f"Migrated {len(legacy)} subjects from {legacy_path} to {self.path}")
+
+    @staticmethod
+    def _write_file(conn, subject_id: str, file_name: str, entry, now: float):
+        entry = entry or {}
+        pages = entry.get("pages", {})
+        conn.execute(
+            "DELETE FROM files WHERE subject_id = ? AND file_name = ?",
+            (subject_id, file_name),
+        )
+        conn.execute(
+            "INSERT INTO files (subject_id, file_name, sha256, alias_of, chunk_count, source_path, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (subject_id, file_name, entry.get("sha256"), entry.get("alias_of"),
+             sum(len(page["chunk_ids"]) for page in pages.values()),
+             entry.get("source_path"), now),
+        )
+        conn.executemany(
+            "INSERT INTO pages (subject_id, file_name, page, hash, chunk_ids) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(subject_id, file_name, str(page), value["hash"], json.dumps(value["chunk_ids"]))
+             for page, value in pages.items()],
+        )
+
+# Subjects
+
+    def create_subject(self, subject_id: str, name: str, path: str):
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT INTO subjects (subject_id, name, path, updated) VALUES (?, ?, ?, ?)",
+                    (subject_id, name, path, time.time()),
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError("Subject already exist") from None
+
+    def exists(self, subject_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM subjects WHERE subject_id = ?", (subject_id,)
+            ).fetchone()
+        return row is not None
+
+    def subject(self, subject_id: str):
+        """{"name", "path", "status", "error"} of a subject, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, path, status, error FROM subjects WHERE subject_id = ?",
+                (subject_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"name": row[0], "path": row[1], "status": row[2], "error": row[3]}
+
+    def list_subjects(self) -> dict:
+        """subject_id -> {"name", "path", "status", "files"}, as metadata.json had it"""
+        with self._transaction("DEFERRED") as conn:
+            subjects = conn.execute(
+                "SELECT subject_id, name, path, status FROM subjects ORDER BY subject_id"
+            ).fetchall()
+            files = conn.execute(
+                "SELECT subject_id, file_name FROM files ORDER BY subject_id, updated"
+            ).fetchall()
+
+        listing = {
+            subject_id: {"name": name, "path": path, "status": status, "files": []}
+            for subject_id, name, path, status in subjects
+        }
+        for subject_id, file_name in files:
+            listing[subject_id]["files"].append(file_name)
+        return listing
+
+    def set_status(self, subject_id: str, status: str, error: str = None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE subjects SET status = ?, error = ?, updated = ? WHERE subject_id = ?",
+                (status, error, time.time(), subject_id),
+            )
+
+# Files
+
+    def files(self, subject_id: str) -> dict:
+        """file_name -> {"sha256", "alias_of", "chunk_count", "source_path", "pages"} for a subject"""
+        with self._transaction("DEFERRED") as conn:
+            rows = conn.execute(
+                "SELECT file_name, sha256, alias_of, chunk_count, source_path "
+                "FROM files WHERE subject_id = ?",
+                (subject_id,),
+            ).fetchall()
+            pages = conn.execute(
+                "SELECT file_name, page, hash, chunk_ids FROM pages WHERE subject_id = ?",
+                (subject_id,),
+            ).fetchall()
+
+        files = {
+            file_name: {"sha256": sha256, "alias_of": alias_of, "chunk_count": chunk_count,
+                        "source_path": source_path, "pages": {}}
+            for file_name, sha256, alias_of, chunk_count, source_path in rows
+        }
+        for file_name, page, page_hash, chunk_ids in pages:
+            files[file_name]["pages"][page] = {"hash": page_hash, "chunk_ids": json.loads(chunk_ids)}
+        return files
+
+    def save_files(self, subject_id: str, entries: dict):
+        """Replace the rows of the given files, all in one transaction"""
+        now = time.time()
+        with self._transaction() as conn:
+            for file_name, entry in entries.items():
+                self._write_file(conn, subject_id, file_name, entry, now)
+
+    def delete_files(self, subject_id: str, file_names: list[str]):
+        with self._transaction() as conn:
+            conn.executemany(
+                "DELETE FROM files WHERE subject_id = ? AND file_name = ?",
+                [(subject_id, name) for name in file_names],
+            )
+
+    def reset_files(self, subject_id: str):
+        """Forget the hashes and pages of a subject's files, so the next
+        ingest parses them again; aliases are kept as they own no chunks"""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM pages WHERE subject_id = ?", (subject_id,)
+            )
+            conn.execute(
+                "UPDATE files SET sha256 = NULL, chunk_count = 0, updated = ? "
+                "WHERE subject_id = ? AND alias_of IS NULL",
+                (time.time(), subject_id),
+            )
+
+    def get_info(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM catalog_info WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_info(self, key: str, value: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_info (key, value) VALUES (?, ?)", (key, value)
+            )
+
+# Leases
+
+    def acquire_lease(self, subject_id: str, owner: str, ttl: float = LEASE_TTL_SECONDS) -> bool:
+        """Take or renew the subject's lease; False while another live owner holds it"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT owner, expires FROM leases WHERE subject_id = ?", (subject_id,)
+            ).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (subject_id, owner, expires) VALUES (?, ?, ?)",
+                (subject_id, owner, now + ttl),
+            )
+        return True
+
+    def release_lease(self, subject_id: str, owner: str):
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE subject_id = ? AND owner = ?", (subject_id, owner)
+            )
+
+    def lease_owner(self, subject_id: str):
+        """Owner of the subject's unexpired lease, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT owner FROM leases WHERE subject_id = ? AND expires > ?",
+                (subject_id, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    @contextmanager
+    def lease(self, subject_id: str, ttl: float = LEASE_TTL_SECONDS,
+              timeout: float | None = None, poll_interval: float = 0.5):
+        """Hold the subject's lease for the block, waiting while another worker has it.
+
+        A daemon thread renews the lease every ttl/3 seconds, so only a
+        dead holder's lease runs out.
+        """
+        owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        deadline = None if timeout is None else time.time() + timeout
+        while not self.acquire_lease(subject_id, owner, ttl):
+            if deadline is not None and time.time() > deadline:
+                raise TimeoutError(
+                    f"Subject {subject_id} is locked by {self.lease_owner(subject_id)}"
+                )
+            time.sleep(poll_interval)
+
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(ttl / 3):
+                if not self.acquire_lease(subject_id, owner, ttl):
+                    print(f"✗ Lost the lease on {subject_id} to {self.lease_owner(subject_id)}")
+
+        thread = threading.Thread(target=renew, name=f"lease:{subject_id}", daemon=True)
+        thread.start()
+        try:
+            yield owner
+        finally:
+            stop.set()
+            thread.join()
+            self.release_lease(subject_id, owner)
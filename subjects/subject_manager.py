@@ -1,114 +1,658 @@
 import os
+import re
 import json
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
+from contextlib import contextmanager
 from typing import List
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-from ingestion.pdf_parser import PDFParser
+from ingestion.chunk_ids import chunk_metadata, make_chunk_id
 from retrieval.vector_retriever import VectorRetriever
+from subjects.subject_catalog import SubjectCatalog, CATALOG_FILE
 
-class SubjectManager:
-    SUBJECT_METADATA_FILE = "metadata.json"
+# Collection langchain's Chroma wrapper uses when no name is given
+DEFAULT_COLLECTION = "langchain"
+
+
+def _hash_file(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _sections(file_name: str, pages: list[tuple[int, str]], pages_per_section: int) -> list[tuple[str, str]]:
+    """(title, text) of consecutive page ranges, for the summary queue"""
+    return [
+        (
+            f"{file_name} pages {pages[i][0]}-{pages[min(i + pages_per_section, len(pages)) - 1][0]}",
+            "\n".join(text for _, text in pages[i:i + pages_per_section]),
+        )
+        for i in range(0, len(pages), pages_per_section)
+    ]
+
+
+def _put(q, item, stop) -> bool:
+    # Blocking put that gives up once the pipeline is stopped
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
 
-    def __init__(self, embedder):
-       self.embedder = embedder
-       self._load_metadata()
 
-# Handel metadata
-    def _load_metadata(self):
-        if not os.path.exists(self.SUBJECT_METADATA_FILE):
-            self.metadata = {"subjects": {}}
-            self._save_metadata()
-        else:
-            with open(self.SUBJECT_METADATA_FILE, "r") as f:
-                self.metadata = json.load(f)
-                if "subjects" not in self.metadata:
-                    self.metadata["subjects"] = {}
-                    self._save_metadata()
+class SubjectManager:
+    def __init__(
+            self,
+            embedder,
+            max_open_subjects: int = 8,
+            max_retrievers: int = 32,
+            catalog_path: str = CATALOG_FILE,
+            lease_timeout: float | None = None,
+    ):
+       self.embedder = embedder
+       self.catalog = SubjectCatalog(catalog_path)
+       # Seconds to wait for another worker's ingest lease; None waits forever
+       self.lease_timeout = lease_timeout
+       self._held_leases = threading.local()
 
+       # Open Chroma handles and retrievers, least recently used first. A
+       # subject may have several retrievers (one per backend and filter),
+       # so they are bounded apart from the handles
+       self.max_open_subjects = max_open_subjects
+       self.max_retrievers = max_retrievers
+       self._vectorstores = OrderedDict()
+       self._retrievers = OrderedDict()
+       self._cache_lock = threading.RLock()
+       self._cache_hits = 0
+       self._cache_misses = 0
+       self._cache_evictions = 0
 
-    def _save_metadata(self):
-        with open(self.SUBJECT_METADATA_FILE, "w") as f:
-            json.dump(self.metadata, f, indent=2)
+       # Called with the subject id after ingest_files changes a subject,
+       # e.g. SemanticCache.invalidate
+       self.ingest_listeners = []
+       self._summary_queues = {}
+       self._question_banks = {}
 
 # Manage Subjects
 
     def create_subject(self, subject_id: str, display_name: str):
-        if subject_id in self.metadata["subjects"]:
-            raise ValueError("Subject already exist")
-        
         path = f"./db/{subject_id}"
+        self.catalog.create_subject(subject_id, display_name, path)
+        self.catalog.set_info(self._collection_key(subject_id), self.collection_name(subject_id))
         os.makedirs(path, exist_ok=True)
 
-        self.metadata["subjects"][subject_id] ={
-            "name": display_name,
-            "path": path,
-            "files":[]
-        }
-        self._save_metadata()
-
     def list_subjects(self):
-        return self.metadata["subjects"]
+        return self.catalog.list_subjects()
     def subject_exist(self, subject_id: str) -> bool:
-        return subject_id in self.metadata["subjects"]
+        return self.catalog.exists(subject_id)
+
+    def subject_path(self, subject_id: str) -> str:
+        subject = self.catalog.subject(subject_id)
+        if subject is None:
+            raise ValueError("Subject does not exist")
+        return subject["path"]
     
 
+    @contextmanager
+    def ingest_lease(self, subject_id: str):
+        """Exclusive lease on a subject's stores and indexes; re-entrant per thread"""
+        held = self._held_leases.__dict__.setdefault("subjects", set())
+        if subject_id in held:
+            yield
+            return
+        with self.catalog.lease(subject_id, timeout=self.lease_timeout):
+            held.add(subject_id)
+            try:
+                yield
+            finally:
+                held.discard(subject_id)
+
 # file ingestion
-    def ingest_files(self, subject_id: str, file_paths: List[str]):
-        if subject_id not in self.metadata["subjects"]:
-            raise ValueError("Subject does not exist")
-        
-        subject = self.metadata["subjects"][subject_id]
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size = 300,
-            chunk_overlap = 50
-        )
+    def ingest_files(
+            self,
+            subject_id: str,
+            file_paths: List[str],
+            precompute_summaries: bool = False,
+            pages_per_section: int = 10,
+            batch_size: int = 256,
+            queue_size: int = 4,
+    ):
+        # One ingest per subject at a time, across threads and processes
+        with self.ingest_lease(subject_id):
+            return self._ingest_files(
+                subject_id, file_paths, precompute_summaries, pages_per_section,
+                batch_size, queue_size,
+            )
 
-        all_chunks = []
-        metadata = []
-        
+    def _ingest_files(self, subject_id, file_paths, precompute_summaries,
+                      pages_per_section, batch_size, queue_size):
+        path = self.subject_path(subject_id)
+        # Opening the store drops a legacy default collection and resets
+        # the hashes read below, so do it first
+        if self.catalog.get_info(self._collection_key(subject_id)) is None:
+            self._open_vectorstore(subject_id)
+        hashes = self.catalog.files(subject_id)
+        updated = set()
+        legacy = []
+
+        # Files whose chunks were dropped are ingested again from where
+        # they were last read, even when the caller did not pass them
+        passed = {os.path.basename(file_path) for file_path in file_paths}
+        file_paths = list(file_paths)
+        for file_name, entry in hashes.items():
+            if entry["sha256"] is not None or entry["alias_of"] or file_name in passed:
+                continue
+            source_path = entry["source_path"] or file_name
+            if os.path.exists(source_path):
+                file_paths.append(source_path)
+            else:
+                print(f"✗ {file_name} not found at {source_path}; pass it to ingest_files to restore its chunks")
+
+        # Decide per file from its content hash, not its name
+        to_parse = []
         for file_path in file_paths:
             file_name = os.path.basename(file_path)
-            
-            if file_name in subject["files"]:
+            file_hash = _hash_file(file_path)
+            entry = hashes.get(file_name)
+
+            if entry and entry["sha256"] == file_hash:
+                continue
+
+            if entry and entry["sha256"] is None:
+                # Ingested before hashes were tracked: the file may have
+                # changed since and its chunks cannot be matched page by
+                # page, so drop them and ingest it again
+                legacy.append(file_name)
+                to_parse.append((file_path, file_hash))
+                continue
+
+            duplicate = next(
+                (name for name, other in hashes.items()
+                 if other["sha256"] == file_hash and name != file_name),
+                None
+            )
+            if duplicate:
+                print(f"{file_name} has the same content as {duplicate}, skipping")
+                hashes[file_name] = {"sha256": file_hash, "alias_of": duplicate, "pages": {},
+                                     "source_path": os.path.abspath(file_path)}
+                updated.add(file_name)
                 continue
-            
-            parser = PDFParser()
-            text = parser.parse(file_path)
-            chunks = splitter.split_text(text)
-            
-            # Add metadata for each chunk
-            for i, chunk in enumerate(chunks):
-                all_chunks.append(chunk)
-                metadata.append({
-                    "source": file_name,
-                    "chunk_id": f"{file_name}_{i}",
-                    "document": file_name
-                })
-            
-            subject["files"].append(file_name)
-        
-        if not all_chunks:
+
+            to_parse.append((file_path, file_hash))
+
+        # We hold the lease, so a subject still marked ingesting had a worker
+        # die midway. That run left the sparse index behind the Chroma
+        # store; the batches it wrote are kept and its files are redone
+        interrupted = self.catalog.subject(subject_id)["status"] in ("ingesting", "failed")
+        if not to_parse and not updated and not interrupted:
             return
-        
-        Chroma.from_texts(
-            all_chunks,
-            embedding=self.embedder,
-            persist_directory=subject["path"],
-            metadata=metadata 
-        )
 
-        self._save_metadata()
+        # Alias and baseline entries touch no store, so record them right away
+        if updated:
+            self.catalog.save_files(subject_id, {name: hashes[name] for name in updated})
+
+        from retrieval.bm25_index import BM25Index
+        from retrieval.numpy_retriever import NumpyRetriever
+        from subjects.question_bank import QuestionBank
+
+        # Re-ingested legacy files remove chunks by source, so rebuild BM25
+        rebuild = interrupted or bool(legacy)
+        bm25 = BM25Index(path) if BM25Index.exists(path) and not rebuild else None
+        written = interrupted
+
+        if to_parse:
+            self.catalog.set_status(subject_id, "ingesting")
+
+            # parse+split -> embed -> upsert, each stage in its own thread with
+            # bounded queues between them, so memory holds a few batches at most
+            stop = threading.Event()
+            chunks = queue.Queue(maxsize=queue_size)
+            embedded = queue.Queue(maxsize=queue_size)
+            stages = [
+                threading.Thread(
+                    target=self._chunk_stage,
+                    args=(subject_id, to_parse, hashes, batch_size,
+                          precompute_summaries, pages_per_section, chunks, stop),
+                    daemon=True,
+                ),
+                threading.Thread(target=self._embed_stage, args=(chunks, embedded, stop), daemon=True),
+            ]
+            for stage in stages:
+                stage.start()
+
+            try:
+                collection = self._open_vectorstore(subject_id)._collection
+                bank = self.question_bank(subject_id) if QuestionBank.exists(path) else None
+                for file_name in legacy:
+                    old_ids = collection.get(where={"source": file_name}, include=[])["ids"]
+                    if old_ids:
+                        collection.delete(ids=old_ids)
+                        written = True
+                        if bank is not None:
+                            bank.delete_by_chunks(old_ids)
+                while True:
+                    item = embedded.get()
+                    if item is None:
+                        break
+                    if item[0] == "error":
+                        raise item[1]
+
+                    if item[0] == "batch":
+                        _, texts, metadatas, ids, embeddings = item
+                        collection.upsert(
+                            ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas
+                        )
+                        written = True
+                        if bm25 is not None:
+                            bm25.add(ids, texts)
+                        continue
+
+                    # Every batch of the file is stored: retire its old chunks
+                    # and record it, so a later crash does not redo this file
+                    _, file_name, entry, stale_ids, replaced_ids = item
+                    if stale_ids:
+                        collection.delete(ids=stale_ids)
+                        written = True
+                        if bm25 is not None:
+                            bm25.remove(stale_ids)
+                    # Questions generated from replaced chunks are no longer
+                    # grounded, including chunks overwritten in place
+                    if replaced_ids and bank is not None:
+                        bank.delete_by_chunks(replaced_ids)
+                    self.catalog.save_files(subject_id, {file_name: entry})
+            except Exception as e:
+                self.catalog.set_status(subject_id, "failed", error=str(e))
+                raise
+            finally:
+                stop.set()
+                if written:
+                    # Retrievers built on the old indexes must be rebuilt
+                    self.invalidate_retrievers(subject_id)
+                    for listener in self.ingest_listeners:
+                        listener(subject_id)
+
+        if written:
+            # Keep the sparse and NumPy indexes in step with the Chroma store
+            if bm25 is not None:
+                bm25.save()
+            else:
+                self.build_bm25_index(subject_id)
+            if NumpyRetriever.exists(path):
+                self.build_numpy_index(subject_id)
+        self.catalog.set_status(subject_id, "ready")
+
+    def _chunk_stage(self, subject_id, to_parse, hashes, batch_size,
+                     precompute_summaries, pages_per_section, out, stop):
+        """Parse and split files into chunk batches, with a marker after each file"""
+        try:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            from ingestion.pdf_parser import PDFParser
+
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size = 300,
+                chunk_overlap = 50
+            )
+
+            # Pages are extracted in a process pool a few files ahead and
+            # arrive range by range, so chunking and embedding start before
+            # a file is fully parsed
+            file_hashes = dict(to_parse)
+            ranges = PDFParser().parse_many(list(file_hashes))
+            for file_path, file_ranges in groupby(ranges, key=itemgetter(0)):
+                file_name = os.path.basename(file_path)
+                old_pages = hashes.get(file_name, {}).get("pages", {})
+                new_pages = {}
+                # Page texts are only held on to for the section summaries
+                pages = []
+                stale_ids = []
+                replaced_ids = []
+                texts, metadatas, ids = [], [], []
+
+                for _, page_range in file_ranges:
+                    for page_number, text in page_range:
+                        if precompute_summaries:
+                            pages.append((page_number, text))
+                        page_key = str(page_number)
+                        page_hash = _hash_text(text)
+                        old_page = old_pages.get(page_key)
+
+                        if old_page and old_page["hash"] == page_hash:
+                            new_pages[page_key] = old_page
+                            continue
+
+                        page_ids = []
+                        # Add metadata for each chunk
+                        for j, chunk in enumerate(splitter.split_text(text)):
+                            chunk_id = make_chunk_id(file_name, page_number, j)
+                            texts.append(chunk)
+                            ids.append(chunk_id)
+                            page_ids.append(chunk_id)
+                            metadatas.append(chunk_metadata(chunk_id))
+                            if len(texts) >= batch_size:
+                                if not _put(out, ("batch", texts, metadatas, ids), stop):
+                                    return
+                                texts, metadatas, ids = [], [], []
+                        new_pages[page_key] = {"hash": page_hash, "chunk_ids": page_ids}
+
+                        # Ids are reused page by page, so only the surplus is
+                        # stale in the stores; every old id had its text replaced
+                        if old_page:
+                            replaced_ids.extend(old_page["chunk_ids"])
+                            kept = set(page_ids)
+                            stale_ids.extend(i for i in old_page["chunk_ids"] if i not in kept)
+
+                if texts and not _put(out, ("batch", texts, metadatas, ids), stop):
+                    return
+
+                # Pages that no longer exist in the revised file
+                for page_key, old_page in old_pages.items():
+                    if page_key not in new_pages:
+                        stale_ids.extend(old_page["chunk_ids"])
+                        replaced_ids.extend(old_page["chunk_ids"])
+
+                if precompute_summaries:
+                    # Queue section summaries; a worker from summary_queue() runs them
+                    self.summary_queue(subject_id).replace_source(
+                        file_name, _sections(file_name, pages, pages_per_section)
+                    )
+
+                entry = {"sha256": file_hashes[file_path], "pages": new_pages,
+                         "source_path": os.path.abspath(file_path)}
+                if not _put(out, ("file", file_name, entry, stale_ids, replaced_ids), stop):
+                    return
+            _put(out, None, stop)
+        except Exception as e:
+            _put(out, ("error", e), stop)
+
+    def _embed_stage(self, source, out, stop):
+        """Embed chunk batches in order, passing file markers through"""
+        while not stop.is_set():
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is not None and item[0] == "batch":
+                try:
+                    item = item + (self.embedder.embed_documents(item[1]),)
+                except Exception as e:
+                    item = ("error", e)
+            if not _put(out, item, stop) or item is None or item[0] == "error":
+                return
+
+    def delete_source(self, subject_id: str, file_name: str):
+        """Remove one ingested file and every chunk derived from it.
+
+        Chunks are found through their "source" metadata, so the rest of
+        the collection and the other files' catalog entries stay untouched.
+        Files recorded as copies of it go too, as they share its chunks.
+        """
+        path = self.subject_path(subject_id)
+        with self.ingest_lease(subject_id):
+            files = self.catalog.files(subject_id)
+            if file_name not in files:
+                raise ValueError(f"{file_name} is not part of {subject_id}")
+            aliases = [name for name, entry in files.items() if entry["alias_of"] == file_name]
+
+            collection = self._open_vectorstore(subject_id)._collection
+            chunk_ids = collection.get(where={"source": file_name}, include=[])["ids"]
+            if chunk_ids:
+                collection.delete(ids=chunk_ids)
+            self.catalog.delete_files(subject_id, [file_name] + aliases)
+            for alias in aliases:
+                print(f"{alias} was a copy of {file_name}, removed as well")
+
+            self.invalidate_retrievers(subject_id)
+            for listener in self.ingest_listeners:
+                listener(subject_id)
+
+            from retrieval.bm25_index import BM25Index
+            from retrieval.numpy_retriever import NumpyRetriever
+            from subjects.question_bank import QuestionBank
+            from subjects.summary_jobs import SUMMARY_DB_FILE
+
+            if QuestionBank.exists(path):
+                self.question_bank(subject_id).delete_by_chunks(chunk_ids)
+            if os.path.exists(os.path.join(path, SUMMARY_DB_FILE)):
+                self.summary_queue(subject_id).replace_source(file_name, [])
+            if BM25Index.exists(path):
+                index = BM25Index(path)
+                index.remove(chunk_ids)
+                index.save()
+            if NumpyRetriever.exists(path):
+                self.build_numpy_index(subject_id)
+            return len(chunk_ids)
+
+    def queue_summaries(self, subject_id: str, pages_per_section: int = 10, replace: bool = False) -> int:
+        """Queue section summaries of already ingested files; returns files queued.
+
+        Pages are rebuilt from the stored chunks, so no file is parsed
+        again. Files that already have jobs are skipped unless replace.
+        """
+        from llm_chains.context_packer import pack_chunks
+        from ingestion.chunk_ids import parse_chunk_id
+
+        with self.ingest_lease(subject_id):
+            summaries = self.summary_queue(subject_id)
+            queued_sources = set() if replace else summaries.sources()
+            collection = self._open_vectorstore(subject_id)._collection
+
+            queued = 0
+            for file_name, entry in self.catalog.files(subject_id).items():
+                if entry["alias_of"] or file_name in queued_sources:
+                    continue
+                data = collection.get(where={"source": file_name}, include=["documents", "metadatas"])
+                by_page = {}
+                for text, metadata in zip(data["documents"], data["metadatas"]):
+                    parsed = parse_chunk_id((metadata or {}).get("chunk_id", ""))
+                    if parsed:
+                        by_page.setdefault(parsed[1], []).append((parsed[2], text, metadata))
+
+                pages = []
+                for page in sorted(by_page):
+                    chunks = sorted(by_page[page], key=lambda chunk: chunk[0])
+                    # Neighbouring chunks overlap; merging them restores the page text
+                    merged = pack_chunks([text for _, text, _ in chunks], [m for _, _, m in chunks])
+                    pages.append((page, "\n".join(merged)))
+                if pages:
+                    summaries.replace_source(file_name, _sections(file_name, pages, pages_per_section))
+                    queued += 1
+            return queued
+
+    def summary_queue(self, subject_id: str):
+        """Resumable queue of precomputed section summaries for a subject"""
+        path = self.subject_path(subject_id)
+
+        from subjects.summary_jobs import SummaryJobQueue
+        with self._cache_lock:
+            if subject_id not in self._summary_queues:
+                self._summary_queues[subject_id] = SummaryJobQueue(path)
+            return self._summary_queues[subject_id]
+
+    def question_bank(self, subject_id: str):
+        """Persistent bank of generated questions for a subject"""
+        path = self.subject_path(subject_id)
+
+        from subjects.question_bank import QuestionBank
+        with self._cache_lock:
+            if subject_id not in self._question_banks:
+                self._question_banks[subject_id] = QuestionBank(path, self.embedder)
+            return self._question_banks[subject_id]
+
+    def build_bm25_index(self, subject_id: str):
+        """Build the subject's BM25 index from every chunk in its Chroma store"""
+        path = self.subject_path(subject_id)
+        with self.ingest_lease(subject_id):
+            from retrieval.bm25_index import BM25Index
+
+            vectorstore = self._open_vectorstore(subject_id)
+            data = vectorstore.get(include=["documents"])
+            # Start empty rather than from bm25.json, which may hold stale chunks
+            index = BM25Index(None)
+            index.path = path
+            index.add(data["ids"], data["documents"])
+            index.save()
+
+    def build_numpy_index(self, subject_id: str):
+        """Export the subject's Chroma vectors into a memory-mapped NumPy index"""
+        path = self.subject_path(subject_id)
+        with self.ingest_lease(subject_id):
+            from retrieval.numpy_retriever import NumpyRetriever
+
+            vectorstore = self._open_vectorstore(subject_id)
+            data = vectorstore.get(include=["embeddings", "documents", "metadatas"])
+            NumpyRetriever.build(
+                path,
+                ids=data["ids"],
+                texts=data["documents"],
+                embeddings=data["embeddings"],
+                metadatas=[m or {} for m in data["metadatas"]],
+                # A new subject, or one whose last file was deleted, has no
+                # vectors to take the width from
+                dim=None if data["ids"] else len(self.embedder.embed_query("")),
+            )
 
 # Retrieval
-    def get_retriever(self, subject_id: str) -> VectorRetriever:
-        if subject_id not in self.metadata["subjects"]:
+    @staticmethod
+    def collection_name(subject_id: str) -> str:
+        """Chroma collection of a subject: 3-63 chars of [a-zA-Z0-9_-]"""
+        safe = re.sub(r"[^a-zA-Z0-9_-]", "_", subject_id)
+        return f"subject_{safe}"[:63].rstrip("_-")
+
+    def _open_vectorstore(self, subject_id: str):
+        with self._cache_lock:
+            vectorstore = self._vectorstores.get(subject_id)
+            if vectorstore is not None:
+                self._vectorstores.move_to_end(subject_id)
+                return vectorstore
+
+            from langchain_community.vectorstores import Chroma
+            vectorstore = Chroma(
+                collection_name = self.collection_name(subject_id),
+                persist_directory = self.subject_path(subject_id),
+                embedding_function = self.embedder
+            )
+            self._migrate_default_collection(subject_id, vectorstore)
+            self._vectorstores[subject_id] = vectorstore
+            while len(self._vectorstores) > self.max_open_subjects:
+                evicted, _ = self._vectorstores.popitem(last=False)
+                self._cache_evictions += 1
+                # Their handle is closed; a new one opens on their next use
+                self._drop_retrievers(evicted, backends=("chroma", "hybrid"))
+            return vectorstore
+
+    @staticmethod
+    def _collection_key(subject_id: str) -> str:
+        return f"collection:{subject_id}"
+
+    def _migrate_default_collection(self, subject_id: str, vectorstore):
+        # Earlier versions wrote into langchain's unnamed default collection,
+        # with random ids and no metadata, so those chunks can be neither
+        # filtered nor deleted by source. Drop them, along with the sparse
+        # indexes built from them, and let ingest_files parse the files again
+        client = vectorstore._client
+        names = [getattr(c, "name", c) for c in client.list_collections()]
+        if DEFAULT_COLLECTION in names:
+            from retrieval.bm25_index import BM25_FILE
+            from retrieval.numpy_retriever import CHUNKS_FILE, VECTORS_FILE
+
+            client.delete_collection(DEFAULT_COLLECTION)
+            self.catalog.reset_files(subject_id)
+            for name in (BM25_FILE, VECTORS_FILE, CHUNKS_FILE):
+                index_path = os.path.join(self.subject_path(subject_id), name)
+                if os.path.exists(index_path):
+                    os.remove(index_path)
+            print(f"Dropped the default collection of {subject_id}; its files will be ingested again")
+        self.catalog.set_info(self._collection_key(subject_id), vectorstore._collection.name)
+
+    def invalidate_retrievers(self, subject_id: str):
+        """Drop cached retrievers of a subject so the next call sees new data"""
+        self._drop_retrievers(subject_id)
+
+    def _drop_retrievers(self, subject_id: str, backends: tuple | None = None):
+        with self._cache_lock:
+            for key in [k for k in self._retrievers
+                        if k[0] == subject_id and (backends is None or k[1] in backends)]:
+                del self._retrievers[key]
+
+    def cache_stats(self) -> dict:
+        import resource
+        with self._cache_lock:
+            mapped = sum(
+                getattr(getattr(r, "vectors", None), "nbytes", 0)
+                for r in self._retrievers.values()
+            )
+            total = self._cache_hits + self._cache_misses
+            return {
+                "open_vectorstores": len(self._vectorstores),
+                "open_retrievers": len(self._retrievers),
+                "max_open_subjects": self.max_open_subjects,
+                "max_retrievers": self.max_retrievers,
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": self._cache_hits / total if total else 0.0,
+                "evictions": self._cache_evictions,
+                "mapped_index_bytes": mapped,
+                "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+
+    def get_retriever(self, subject_id: str, backend: str = "chroma", where: dict | None = None):
+        """Cached retriever of a subject; where filters chunks by metadata,
+        e.g. {"source": "Chapter_05.pdf"}"""
+        if not self.subject_exist(subject_id):
             raise ValueError("Subject does not exist")
-        path = self.metadata["subjects"][subject_id]["path"]
 
-        vectorstore = Chroma(
-            persist_directory = path,
-            embedding_function = self.embedder
-        )
-        return VectorRetriever(vectorstore)
+        key = (subject_id, backend, json.dumps(where, sort_keys=True) if where else None)
+        with self._cache_lock:
+            retriever = self._retrievers.get(key)
+            if retriever is not None:
+                self._cache_hits += 1
+                self._retrievers.move_to_end(key)
+                return retriever
+            self._cache_misses += 1
+
+        if self.catalog.get_info(self._collection_key(subject_id)) is None:
+            # Moves the subject off the legacy default collection first
+            self.ingest_files(subject_id, [])
+        retriever = self._build_retriever(subject_id, backend, where)
+        with self._cache_lock:
+            self._retrievers[key] = retriever
+            while len(self._retrievers) > self.max_retrievers:
+                self._retrievers.popitem(last=False)
+                self._cache_evictions += 1
+        return retriever
+
+    def _build_retriever(self, subject_id: str, backend: str, where: dict | None = None):
+        path = self.subject_path(subject_id)
+
+        if backend == "numpy":
+            from retrieval.numpy_retriever import NumpyRetriever
+            if not NumpyRetriever.exists(path):
+                self.build_numpy_index(subject_id)
+            return NumpyRetriever(path, self.embedder, where=where)
+        if backend not in ("chroma", "hybrid"):
+            raise ValueError(f"Unsupported retriever backend: {backend}")
+
+        retriever = VectorRetriever(lambda: self._open_vectorstore(subject_id), where=where)
 
+        if backend == "hybrid":
+            if where:
+                # bm25.json keeps no metadata to filter on
+                raise ValueError("Metadata filters need the chroma or numpy backend")
+            from retrieval.bm25_index import BM25Index
+            from retrieval.hybrid_retriever import HybridRetriever
+            if not BM25Index.exists(path):
+                self.build_bm25_index(subject_id)
+            return HybridRetriever(retriever, BM25Index(path))
+        return retriever
@@ -0,0 +1,246 @@
+"""Precomputed section summaries of a subject, drained by a resumable worker.
+
+Usage:
+    python -m subjects.summary_jobs <subject_id> [--queue] [--watch]
+        [--model mistral] [--max-jobs 20]
+    python -m subjects.summary_jobs --all [...]
+
+Sections are queued by ingest_files(precompute_summaries=True), or with
+--queue for files ingested without it. --watch keeps polling for new jobs.
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable
+
+SUMMARY_DB_FILE = "summaries.sqlite3"
+MAX_ATTEMPTS = 3
+# A job running longer than this lost its worker and is handed out again
+STALE_AFTER_SECONDS = 30 * 60
+
+
+class SummaryJobQueue:
+    """Resumable queue of section summaries for one subject.
+
+    Jobs live in db/<subject>/summaries.sqlite3, so a worker that dies
+    mid-run picks up where it stopped: its jobs go back to "pending" once
+    they have been "running" for stale_after seconds. Workers in several
+    processes can share a queue; each job is claimed by exactly one. Each
+    job summarises a page range of a file.
+    """
+
+    def __init__(self, path: str, stale_after: float = STALE_AFTER_SECONDS):
+        self.path = path
+        self.stale_after = stale_after
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(path, SUMMARY_DB_FILE), timeout=30, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS summary_jobs (
+                   id INTEGER PRIMARY KEY,
+                   source TEXT NOT NULL,
+                   kind TEXT NOT NULL,
+                   title TEXT NOT NULL,
+                   input TEXT NOT NULL,
+                   status TEXT NOT NULL DEFAULT 'pending',
+                   summary TEXT,
+                   attempts INTEGER NOT NULL DEFAULT 0,
+                   error TEXT,
+                   updated REAL NOT NULL
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_summary_jobs_status ON summary_jobs (status)"
+        )
+        # Chapter jobs of earlier versions merged section summaries nobody read
+        self._conn.execute("DELETE FROM summary_jobs WHERE kind = 'chapter'")
+        self._conn.commit()
+
+    def replace_source(self, source: str, sections: list[tuple[str, str]]):
+        """Drop the old jobs of a file and queue (title, text) sections for it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM summary_jobs WHERE source = ?", (source,))
+            self._conn.executemany(
+                "INSERT INTO summary_jobs (source, kind, title, input, updated) "
+                "VALUES (?, 'section', ?, ?, ?)",
+                [(source, title, text, now) for title, text in sections if text.strip()],
+            )
+            self._conn.commit()
+
+    def _claim(self):
+        with self._lock:
+            now = time.time()
+            # Resume jobs whose worker died; a live worker's jobs stay its own
+            self._conn.execute(
+                "UPDATE summary_jobs SET status = 'pending' WHERE status = 'running' AND updated < ?",
+                (now - self.stale_after,),
+            )
+            self._conn.commit()
+            while True:
+                row = self._conn.execute(
+                    "SELECT id, source, kind, title, input FROM summary_jobs "
+                    "WHERE status = 'pending' ORDER BY id LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                # Another process may claim the same row between the two
+                # statements; only the UPDATE that still sees it pending wins
+                claimed = self._conn.execute(
+                    "UPDATE summary_jobs SET status = 'running', attempts = attempts + 1, updated = ? "
+                    "WHERE id = ? AND status = 'pending'",
+                    (now, row[0]),
+                ).rowcount
+                self._conn.commit()
+                if claimed:
+                    return row
+
+    def _finish(self, job_id: int, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE summary_jobs SET status = 'done', summary = ?, error = NULL, updated = ? "
+                "WHERE id = ?",
+                (summary, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def _fail(self, job_id: int, error: str):
+        with self._lock:
+            (attempts,) = self._conn.execute(
+                "SELECT attempts FROM summary_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+            self._conn.execute(
+                "UPDATE summary_jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def run_pending(self, summarize: Callable[[str, str], str], max_jobs: int | None = None) -> int:
+        """Work through pending jobs with summarize(title, text); returns jobs done"""
+        done = 0
+        while max_jobs is None or done < max_jobs:
+            job = self._claim()
+            if job is None:
+                break
+            job_id, source, kind, title, text = job
+            try:
+                self._finish(job_id, summarize(title, text))
+                done += 1
+            except Exception as e:
+                print(f"✗ Summary job {title}: {type(e).__name__}: {e}")
+                self._fail(job_id, str(e))
+        return done
+
+    def start_worker(self, summarize: Callable[[str, str], str], poll_interval: float = 5.0) -> threading.Thread:
+        """Drain the queue on a daemon thread, polling for newly queued jobs"""
+        def loop():
+            while True:
+                if self.run_pending(summarize) == 0:
+                    time.sleep(poll_interval)
+
+        thread = threading.Thread(target=loop, name=f"summaries:{self.path}", daemon=True)
+        thread.start()
+        return thread
+
+    def progress(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM summary_jobs GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def sources(self) -> set[str]:
+        """Files that have summary jobs, whatever their status"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT source FROM summary_jobs").fetchall()
+        return {source for (source,) in rows}
+
+    def section_summaries(self) -> list[tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT title, summary FROM summary_jobs "
+                "WHERE kind = 'section' AND status = 'done' ORDER BY id"
+            ).fetchall()
+
+    def relevant_summaries(self, topic: str, top_k: int = 4, min_overlap: float = 0.5) -> list[str]:
+        """Best matching finished section summaries for a topic, by BM25.
+
+        Stopwords are ignored, and a summary must contain at least
+        min_overlap of the topic's remaining terms. An empty list tells
+        the caller to fall back to chunk retrieval.
+        """
+        from retrieval.bm25_index import BM25Index, STOPWORDS, tokenize
+
+        terms = {t for t in tokenize(topic) if t not in STOPWORDS}
+        sections = self.section_summaries()
+        if not sections or not terms:
+            return []
+        index = BM25Index(None)
+        index.add(
+            [str(i) for i in range(len(sections))],
+            [f"{title}\n{summary}" for title, summary in sections],
+        )
+        return [
+            text for _, text, _ in index.search(" ".join(sorted(terms)), top_k=top_k)
+            if len(terms & set(tokenize(text))) >= min_overlap * len(terms)
+        ]
+
+    def close(self):
+        self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the section summary jobs of a subject")
+    parser.add_argument("subject_id", nargs="?")
+    parser.add_argument("--all", action="store_true", help="run every subject")
+    parser.add_argument("--queue", action="store_true",
+                        help="first queue sections of files ingested without precompute_summaries")
+    parser.add_argument("--pages-per-section", type=int, default=10)
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--max-jobs", type=int, default=None, help="per subject")
+    parser.add_argument("--watch", action="store_true", help="keep polling for newly queued jobs")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    args = parser.parse_args(argv)
+    if bool(args.subject_id) == args.all:
+        parser.error("give either a subject_id or --all")
+
+    from embedding.cached_embedder import CachedEmbedder
+    from embedding.local_embedder import LocalEmbedder
+    from llm_chains.summary_chain import SummaryChain
+    from subjects.subject_manager import SubjectManager
+
+    manager = SubjectManager(CachedEmbedder(LocalEmbedder(show_progress_bar=False)))
+    if args.all:
+        subject_ids = list(manager.list_subjects())
+    elif manager.subject_exist(args.subject_id):
+        subject_ids = [args.subject_id]
+    else:
+        parser.error(f"Unknown subject: {args.subject_id}")
+
+    # summarize_section only prompts the model; it retrieves nothing
+    summarize = SummaryChain(None, model=args.model).summarize_section
+    workers = []
+    for subject_id in subject_ids:
+        if args.queue:
+            queued = manager.queue_summaries(subject_id, pages_per_section=args.pages_per_section)
+            print(f"{subject_id}: queued sections of {queued} files")
+        summaries = manager.summary_queue(subject_id)
+        if args.watch:
+            workers.append(summaries.start_worker(summarize, poll_interval=args.poll_interval))
+            continue
+        done = summaries.run_pending(summarize, max_jobs=args.max_jobs)
+        print(f"{subject_id}: {done} summaries done, {summaries.progress()}")
+
+    for worker in workers:
+        # Workers poll forever; stop them with Ctrl+C
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
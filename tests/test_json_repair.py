@@ -0,0 +1,70 @@
+import json
+
+from llm_chains.json_repair import repair_json
+
+
+def _question(i, prompt=None):
+    return {
+        "id": i,
+        "type": "true_false",
+        "prompt": prompt or f"Statement {i}",
+        "grading": {"correct_answer": True},
+        "explanation": "because",
+    }
+
+
+def test_valid_json_is_returned_unchanged():
+    text = json.dumps({"questions": [_question(1)]})
+    assert repair_json(text) == text
+
+
+def test_strips_markdown_fence_and_preamble():
+    body = json.dumps({"questions": [_question(1)]})
+    repaired = repair_json(f"Here is the quiz:\n```json\n{body}\n```")
+    assert json.loads(repaired) == json.loads(body)
+
+
+def test_removes_trailing_commas():
+    repaired = repair_json('{"questions": [{"id": 1, "prompt": "a",},]}')
+    assert json.loads(repaired) == {"questions": [{"id": 1, "prompt": "a"}]}
+
+
+def test_inserts_missing_commas_between_objects_and_fields():
+    text = '{"questions": [\n{"id": 1}\n{"id": 2}\n],\n"quiz_type": "mcq"\n"difficulty": "easy"}'
+    data = json.loads(repair_json(text))
+    assert data["questions"] == [{"id": 1}, {"id": 2}]
+    assert data["difficulty"] == "easy"
+
+
+def test_comma_fixes_leave_string_contents_alone():
+    text = '{"questions": [{"prompt": "Sets {x} {y}", "hint": "[a] [b]", "note": "end,]"},]}'
+    data = json.loads(repair_json(text))
+    assert data["questions"][0]["prompt"] == "Sets {x} {y}"
+    assert data["questions"][0]["hint"] == "[a] [b]"
+    assert data["questions"][0]["note"] == "end,]"
+
+
+def test_single_quotes_and_python_literals():
+    text = "{'questions': [{'id': 1, 'prompt': 'It\\'s fine', 'answer': True, 'extra': None}]}"
+    data = json.loads(repair_json(text))
+    assert data["questions"][0]["prompt"] == "It's fine"
+    assert data["questions"][0]["answer"] is True
+    assert data["questions"][0]["extra"] is None
+
+
+def test_truncated_output_keeps_complete_questions():
+    full = json.dumps({"quiz_type": "true_false", "questions": [_question(1), _question(2), _question(3)]})
+    truncated = full[:full.index('"Statement 3"') + 5]
+    data = json.loads(repair_json(truncated))
+    assert [q["id"] for q in data["questions"]] == [1, 2]
+
+
+def test_truncation_ignores_brackets_inside_strings():
+    full = json.dumps({"questions": [_question(1, "Is {a} in [b]?"), _question(2)]})
+    truncated = full[:full.index('"Statement 2"')]
+    data = json.loads(repair_json(truncated))
+    assert [q["prompt"] for q in data["questions"]] == ["Is {a} in [b]?"]
+
+
+def test_hopeless_input_returns_none():
+    assert repair_json("no json here") is None